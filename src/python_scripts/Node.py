@@ -2,6 +2,9 @@ from typing import List
 
 
 class Node:
+    # No per-instance __dict__, a Node is just its four fields
+    __slots__ = ("id", "x", "y", "neighbors")
+
     def __init__(self, id: int, x: float, y: float, neighbors: List[int]):
         self.id = id
         self.x = x
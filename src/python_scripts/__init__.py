@@ -0,0 +1,79 @@
+import importlib
+import os
+import sys
+
+
+"""
+The scripts as a library, e.g. (with src on the path)
+
+    from python_scripts import CayleyGraphWalk, LambdaSweep
+
+Importing the package (or any of the modules) runs no demo and loads neither
+matplotlib nor networkx, they are only imported once something is drawn. The
+names below are imported from their modules on first access, so only the modules
+that are used get loaded.
+
+The modules are also run as scripts and import each other by their plain names
+(from compact_graph import ...), which is why their directory is put on the path.
+Use the names exported here rather than python_scripts.<module>, which would be
+a second copy of the module.
+"""
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.append(_here)
+
+_EXPORTS = {
+    "Node": "Node",
+    "CayleyGraph": "cayley_graph",
+    "CompactGraph": "compact_graph",
+    "estimate_cover_times": "cover_time",
+    "DihedralSpectrum": "dihedral_spectrum",
+    "LumpedChain": "distance_lumping",
+    "DistanceOracle": "distance_oracle",
+    "FrontierDistanceOracle": "distance_oracle",
+    "ElectricalNetwork": "electrical_network",
+    "CyclicWalk": "fft_mixing",
+    "load_graph": "graph_loaders",
+    "save_graph": "graph_loaders",
+    "GraphRenderer": "graph_renderer",
+    "FreeGroup": "infinite_cayley",
+    "FreeProduct": "infinite_cayley",
+    "IntegerLattice": "infinite_cayley",
+    "LazyCayleyWalk": "infinite_cayley",
+    "Instrumentation": "instrumentation",
+    "LambdaSweep": "lambda_sweep",
+    "MarkovChain": "markov_chain",
+    "DihedralGraphWalk": "on_cayley_graph_Dn",
+    "CayleyGraphWalk": "on_cayley_graph_Zn",
+    "random_walk_nd": "on_integer_lattices",
+    "random_walk_nd_statistics": "on_integer_lattices",
+    "GraphWalk": "on_some_graph",
+    "CayleyLevels": "rare_event",
+    "KernelLevels": "rare_event",
+    "crude_return_probability": "rare_event",
+    "estimate_return_probability": "rare_event",
+    "record_walk": "simulation",
+    "simulate_walk": "simulation",
+    "FirstPassage": "streaming_stats",
+    "MaxDistance": "streaming_stats",
+    "Occupation": "streaming_stats",
+    "ReturnCount": "streaming_stats",
+    "stream_walks": "streaming_stats",
+    "TrajectoryStore": "trajectory_store",
+    "TrajectoryWriter": "trajectory_store",
+    "TransitionKernel": "transition_kernel",
+    "WalkerPool": "walker_pool",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, List, Optional
+import on_cayley_graph_Dn
+import on_cayley_graph_Zn
+import on_integer_lattices
+from walker_pool import WalkerPool, kernel_paths
+
+
+"""
+Benchmarks for the walk simulations.
+
+Run e.g.
+
+    python benchmark.py --quick --output bench.json
+    python benchmark.py --baseline bench.json
+
+Every case reports throughput (steps_per_second, higher is better) and, where a
+graph is built, build and kernel times in seconds and the peak memory of the
+build in MB (lower is better). Timings are the best of --repeat runs, the memory
+is measured in a separate run with tracemalloc, which would distort the times.
+
+The results are written as JSON together with the Python / numpy version, the
+machine and the git commit. Given a baseline file from an earlier run, every
+metric that got worse by more than --tolerance (relative) is reported as a
+regression and the exit code is 1, so the script can be used in CI.
+
+Without --quick the graphs go up to n = 10^7 (D_n then has 2 * 10^7 vertices),
+which needs a few GB of memory.
+"""
+
+HIGHER_IS_BETTER = ("steps_per_second",)
+# Differences below these values are timer / allocator noise, not regressions
+NOISE_FLOOR = {"seconds": 0.01, "mb": 1.0}
+
+
+def _best_time(run: Callable[[], object], repeat: int) -> float:
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory_mb(run: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_lattice(dim: int, steps: int, walkers: int, repeat: int) -> Dict[str, float]:
+    rng = np.random.default_rng(0)
+    seconds = _best_time(
+        lambda: on_integer_lattices.random_walk_nd_statistics(
+            walkers, steps, dim, rng=rng
+        ),
+        repeat,
+    )
+    return {"steps_per_second": walkers * steps / seconds}
+
+
+def bench_lattice_per_step(dim: int, steps: int, repeat: int) -> Dict[str, float]:
+    """The original step-by-step walkers random_walk_1d, _2d and _3d."""
+    walk = getattr(on_integer_lattices, "random_walk_%dd" % dim)
+    seconds = _best_time(lambda: walk(steps), repeat)
+    return {"steps_per_second": steps / seconds}
+
+
+def bench_cayley(
+    module, cls_name: str, n: int, lambd: Optional[float], steps: int, repeat: int
+) -> Dict[str, float]:
+    cls = getattr(module, cls_name)
+    config = dict(use_lambda_rw=lambd is not None, lambd=lambd, verbose=False)
+
+    start = time.perf_counter()
+    walk = cls(n, **config)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    walk.get_kernel()
+    kernel_seconds = time.perf_counter() - start
+    # The first simulate call also converts the kernel for the sampling loop
+    walk.simulate(0, 1, seed=0)
+    seconds = _best_time(lambda: walk.simulate(0, steps, seed=0), repeat)
+    # get_random_node, as used by the animation
+    per_step = min(steps, 20000)
+    nodes = walk.walk_nodes(0, per_step)
+    per_step_seconds = _best_time(lambda: sum(1 for _ in nodes), 1)
+    del walk
+
+    def build():
+        cls(n, **config).get_kernel()
+
+    return {
+        "build_seconds": build_seconds,
+        "kernel_seconds": kernel_seconds,
+        "peak_memory_mb": _peak_memory_mb(build),
+        "steps_per_second": steps / seconds,
+        "per_step_steps_per_second": per_step / per_step_seconds,
+    }
+
+
+def bench_pool(
+    workers: int, n: int, walkers: int, steps: int, repeat: int
+) -> Dict[str, float]:
+    walk = on_cayley_graph_Zn.CayleyGraphWalk(n, use_lambda_rw=False)
+    kernel = walk.get_kernel()
+
+    def run():
+        pool = WalkerPool(seed=0, workers=workers, chunk_size=max(1, walkers // 8))
+        pool.run(kernel_paths, walkers, kernel, 0, steps)
+
+    seconds = _best_time(run, repeat)
+    return {"steps_per_second": walkers * steps / seconds}
+
+
+def run_benchmarks(
+    quick: bool = False, repeat: int = 3, only: Optional[str] = None
+) -> List[Dict[str, object]]:
+    sizes = [10, 10**3, 10**5] if quick else [10, 10**3, 10**5, 10**7]
+    steps = 10**5 if quick else 10**6
+    cases = []
+    for dim in range(1, 6):
+        cases.append(
+            (
+                "lattice/d=%d" % dim,
+                lambda dim=dim: bench_lattice(dim, steps // 10, 100, repeat),
+            )
+        )
+    for dim in range(1, 4):
+        cases.append(
+            (
+                "lattice_per_step/d=%d" % dim,
+                lambda dim=dim: bench_lattice_per_step(dim, steps // 10, repeat),
+            )
+        )
+    for module, cls_name, group in (
+        (on_cayley_graph_Zn, "CayleyGraphWalk", "Zn"),
+        (on_cayley_graph_Dn, "DihedralGraphWalk", "Dn"),
+    ):
+        for n in sizes:
+            for walk, lambd in (("simple", None), ("lambda", 3.0)):
+                cases.append(
+                    (
+                        "%s/n=%d/%s" % (group, n, walk),
+                        lambda m=module, c=cls_name, n=n, l=lambd: bench_cayley(
+                            m, c, n, l, steps, repeat
+                        ),
+                    )
+                )
+    for workers in sorted({1, os.cpu_count() or 1}):
+        cases.append(
+            (
+                "pool/workers=%d" % workers,
+                lambda w=workers: bench_pool(w, 10**5, 64, steps // 100, repeat),
+            )
+        )
+
+    results = []
+    for name, case in cases:
+        if only is not None and only not in name:
+            continue
+        metrics = case()
+        print(name, " ".join("%s=%.4g" % item for item in metrics.items()))
+        results.append({"name": name, **metrics})
+    return results
+
+
+def _metadata() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(
+    results: List[Dict[str, object]],
+    baseline: List[Dict[str, object]],
+    tolerance: float = 0.2,
+) -> List[str]:
+    """Descriptions of all metrics that are worse than in the baseline."""
+    previous = {entry["name"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if old is None:
+            continue
+        for metric, value in entry.items():
+            if metric == "name" or metric not in old:
+                continue
+            unit = metric.rsplit("_", 1)[-1]
+            if max(value, old[metric]) < NOISE_FLOOR.get(unit, 0.0):
+                continue
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = old[metric] / value - 1
+            else:
+                change = value / old[metric] - 1
+            if change > tolerance:
+                regressions.append(
+                    "%s %s: %.4g -> %.4g (%.0f%% worse)"
+                    % (entry["name"], metric, old[metric], value, 100 * change)
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for the walk simulations")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="only cases whose name contains this")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results of an earlier run to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.quick, args.repeat, args.only)
+    with open(args.output, "w") as f:
+        json.dump({"metadata": _metadata(), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+        print("No regressions compared to", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import numpy as np
+from collections import deque
+from typing import Callable, Hashable, List, Optional, Sequence
+from transition_kernel import TransitionKernel
+
+
+"""
+Generic builder for Cayley graphs of finite groups.
+
+A group can be given by permutation generators, by a product table or by a
+multiplication callback. The elements are enumerated by a breadth-first search
+from the identity and get dense integer ids 0, ..., |G| - 1 in BFS order, so the
+identity is node 0 and ids are sorted by distance. The graph is stored as CSR
+arrays (neighbors of v are indices[offsets[v]:offsets[v + 1]]) and the word
+metric distances to the identity as an int array.
+
+The edges are g -> g * s for every generator s. As in the rest of the repository
+the graph is undirected, so the generating set is closed under inverses
+(inverses are added automatically where the group structure is known).
+"""
+
+
+def _index_dtype(num_nodes: int):
+    return np.int32 if num_nodes < 2**31 else np.int64
+
+
+def csr_neighbors(
+    offsets: np.ndarray, indices: np.ndarray, nodes: np.ndarray
+) -> np.ndarray:
+    """All neighbors of `nodes` (with repetitions) as one flat array."""
+    starts = offsets[nodes]
+    lengths = offsets[nodes + 1] - starts
+    total = int(lengths.sum())
+    # Positions start[i], ..., start[i] + len[i] - 1 for every node, without a loop
+    shift = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[shift + np.arange(total)]
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    # Plain sort based unique, much faster than np.unique for large uint64 arrays
+    keys = np.sort(keys, axis=None)
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    return keys[keep]
+
+
+def bfs_distances(
+    offsets: np.ndarray, indices: np.ndarray, source: int = 0
+) -> np.ndarray:
+    """Graph distances from `source` (-1 for unreachable nodes), layer by layer."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    distances = np.full(len(offsets) - 1, -1, dtype=np.int32)
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    d = 0
+    while len(frontier):
+        d += 1
+        nbrs = csr_neighbors(offsets, indices, frontier)
+        nbrs = np.unique(nbrs[distances[nbrs] < 0])
+        distances[nbrs] = d
+        frontier = nbrs
+    return distances
+
+
+class CayleyGraph:
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        distances: np.ndarray,
+        elements: Optional[object] = None,
+    ):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = indices
+        self.distances = distances
+        # Group element of every node id (an encoding, a list or None)
+        self.elements = elements
+        self.num_nodes = len(self.offsets) - 1
+
+    @classmethod
+    def from_regular(
+        cls,
+        neighbor_table: np.ndarray,
+        distances: Optional[np.ndarray] = None,
+        elements=None,
+    ) -> "CayleyGraph":
+        """From a (|G|, |S|) table whose row v holds the ids of v * s for all s."""
+        num_nodes, degree = neighbor_table.shape
+        offsets = np.arange(num_nodes + 1, dtype=np.int64) * degree
+        indices = neighbor_table.astype(_index_dtype(num_nodes)).ravel()
+        if distances is None:
+            distances = bfs_distances(offsets, indices)
+        return cls(offsets, indices, distances, elements)
+
+    @classmethod
+    def from_permutations(
+        cls, generators: Sequence[Sequence[int]], chunk_size: int = 1 << 18
+    ) -> "CayleyGraph":
+        """
+        Cayley graph of the group generated by permutations of {0, ..., m - 1}.
+        For m <= 16 every permutation is packed into a single uint64 (4 bits per
+        entry) and the BFS runs on sorted key arrays, which keeps groups with
+        10^6 - 10^7 elements within a few hundred megabytes.
+        """
+        gens = [np.asarray(g, dtype=np.int64) for g in generators]
+        m = len(gens[0])
+        for g in list(gens):
+            inverse = np.argsort(g)
+            if not any(np.array_equal(inverse, h) for h in gens):
+                gens.append(inverse)
+        identity = np.arange(m)
+        gens = [g for g in gens if not np.array_equal(g, identity)]
+
+        if m > 16:
+            perms = [tuple(int(x) for x in g) for g in gens]
+            return cls.from_multiplication(
+                tuple(range(m)), perms, lambda p, s: tuple(p[i] for i in s)
+            )
+
+        shifts = (4 * np.arange(m)).astype(np.uint64)
+
+        def encode(perms: np.ndarray) -> np.ndarray:
+            return np.bitwise_or.reduce(perms.astype(np.uint64) << shifts, axis=1)
+
+        def decode(keys: np.ndarray) -> np.ndarray:
+            return ((keys[:, None] >> shifts) & np.uint64(15)).astype(np.int64)
+
+        def products(keys: np.ndarray) -> np.ndarray:
+            # Column j holds the keys of p * s_j, i.e. the permutation p[s_j]
+            perms = decode(keys)
+            return np.stack([encode(perms[:, g]) for g in gens], axis=1)
+
+        layers = [encode(identity[None, :])]
+        visited = layers[0]
+        while True:
+            frontier = layers[-1]
+            new = []
+            for i in range(0, len(frontier), chunk_size):
+                cand = _sorted_unique(products(frontier[i : i + chunk_size]))
+                pos = np.minimum(np.searchsorted(visited, cand), len(visited) - 1)
+                new.append(cand[visited[pos] != cand])
+            new = _sorted_unique(np.concatenate(new))
+            if not len(new):
+                break
+            layers.append(new)
+            # new and visited are disjoint and sorted, so a merge is enough
+            visited = np.insert(visited, np.searchsorted(visited, new), new)
+
+        elements = np.concatenate(layers)
+        num_nodes = len(elements)
+        distances = np.repeat(
+            np.arange(len(layers), dtype=np.int32), [len(layer) for layer in layers]
+        )
+        del layers
+
+        # visited is sorted, order maps positions in it back to BFS ids
+        order = np.empty(num_nodes, dtype=_index_dtype(num_nodes))
+        order[np.searchsorted(visited, elements)] = np.arange(num_nodes)
+        table = np.empty((num_nodes, len(gens)), dtype=_index_dtype(num_nodes))
+        for i in range(0, num_nodes, chunk_size):
+            nbr_keys = products(elements[i : i + chunk_size])
+            table[i : i + chunk_size] = order[np.searchsorted(visited, nbr_keys)]
+        return cls.from_regular(table, distances, elements)
+
+    @classmethod
+    def from_product_table(
+        cls,
+        table: Sequence[Sequence[int]],
+        generators: Sequence[int],
+        identity: int = 0,
+    ) -> "CayleyGraph":
+        """table[g][h] is the index of g * h, generators are indices into the table."""
+        table = np.asarray(table, dtype=np.int64)
+        gens = list(generators)
+        for s in list(gens):
+            inverse = int(np.flatnonzero(table[s] == identity)[0])
+            if inverse not in gens:
+                gens.append(inverse)
+        gens = [s for s in gens if s != identity]
+
+        order = [identity]
+        ids = np.full(len(table), -1, dtype=np.int64)
+        ids[identity] = 0
+        distances = [0]
+        frontier = np.array([identity])
+        d = 0
+        while len(frontier):
+            d += 1
+            nbrs = table[frontier][:, gens].ravel()
+            nbrs = np.unique(nbrs[ids[nbrs] < 0])
+            ids[nbrs] = np.arange(len(order), len(order) + len(nbrs))
+            order.extend(nbrs.tolist())
+            distances.extend([d] * len(nbrs))
+            frontier = nbrs
+
+        order = np.array(order)
+        neighbor_table = ids[table[order][:, gens]]
+        return cls.from_regular(
+            neighbor_table, np.array(distances, dtype=np.int32), order
+        )
+
+    @classmethod
+    def from_multiplication(
+        cls,
+        identity: Hashable,
+        generators: Sequence[Hashable],
+        multiply: Callable[[Hashable, Hashable], Hashable],
+    ) -> "CayleyGraph":
+        """
+        Works for any group whose elements are hashable. The generating set must
+        already be closed under inverses.
+        """
+        ids = {identity: 0}
+        elements: List[Hashable] = [identity]
+        distances = [0]
+        rows = []
+        queue = deque([identity])
+        while queue:
+            g = queue.popleft()
+            row = []
+            for s in generators:
+                h = multiply(g, s)
+                if h not in ids:
+                    ids[h] = len(elements)
+                    elements.append(h)
+                    distances.append(distances[ids[g]] + 1)
+                    queue.append(h)
+                row.append(ids[h])
+            rows.append(row)
+        return cls.from_regular(
+            np.array(rows), np.array(distances, dtype=np.int32), elements
+        )
+
+    @classmethod
+    def cyclic_product(cls, orders: Sequence[int]) -> "CayleyGraph":
+        """
+        Z/n_1Z x ... x Z/n_kZ with generators +-e_i. Element (c_1, ..., c_k) has id
+        c_1 + n_1 * (c_2 + n_2 * (...)) instead of a BFS id, which is cheap to compute.
+        """
+        orders = [n for n in orders if n > 1]
+        num_nodes = int(np.prod(orders))
+        ids = np.arange(num_nodes, dtype=np.int64)
+        coords = np.unravel_index(ids, orders[::-1])[::-1]
+        columns = []
+        distances = np.zeros(num_nodes, dtype=np.int32)
+        stride = 1
+        for n, c in zip(orders, coords):
+            distances += np.minimum(c, n - c).astype(np.int32)
+            for step in (1, -1) if n > 2 else (1,):
+                columns.append(ids + (((c + step) % n) - c) * stride)
+            stride *= n
+        return cls.from_regular(np.stack(columns, axis=1), distances)
+
+    @classmethod
+    def dihedral(cls, n: int) -> "CayleyGraph":
+        """
+        D_n with generators {a, a^-1, b} (rotation and reflection). As in
+        on_cayley_graph_Dn.py, id i is the rotation a^i and id n + i is a^i b.
+        """
+        i = np.arange(n, dtype=np.int64)
+        # a^i * a = a^(i+1), a^i b * a = a^(i-1) b and * b toggles the reflection
+        rotations = np.stack([(i + 1) % n, (i - 1) % n, i + n], axis=1)
+        reflections = np.stack([(i - 1) % n + n, (i + 1) % n + n, i], axis=1)
+        table = np.concatenate([rotations, reflections])
+        if n <= 2:
+            table = table[:, [0, 2]]
+        # |a^i| = min(i, n - i) and a^i b = b a^-i is one letter longer
+        rotation_distances = np.minimum(i, n - i).astype(np.int32)
+        distances = np.concatenate([rotation_distances, rotation_distances + 1])
+        return cls.from_regular(table, distances)
+
+    def sphere_sizes(self) -> np.ndarray:
+        """Number of elements at distance 0, 1, 2, ... from the identity."""
+        return np.bincount(self.distances)
+
+    def kernel(self, lambd: Optional[float] = None) -> TransitionKernel:
+        """Simple random walk (lambd=None) or RW_lambda kernel on this graph."""
+        return TransitionKernel.from_csr(
+            self.offsets, self.indices, self.distances, lambd
+        )
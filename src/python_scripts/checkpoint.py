@@ -0,0 +1,118 @@
+import json
+import os
+import time
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+"""
+Checkpoints of long runs, so that a killed run continues where it stopped.
+
+A checkpoint is one .npz file with
+
+- the state arrays of the run (walker positions, statistics, ...), under their
+  names,
+- the states of the random generators, as JSON (the PCG64 state consists of
+  128-bit integers, which do not fit into a numpy array),
+- a JSON dict of metadata, e.g. the step count and the parameters of the run.
+
+It is written to a temporary file, flushed to disk and then renamed over the old
+checkpoint, so a crash during the write leaves the previous checkpoint intact.
+
+A run continues bit-for-bit identically if it saves its complete state between
+two steps and restores the generator state with restore_generator, see
+stream_walks in streaming_stats.py.
+"""
+
+_RNG_KEY = "__rng_states__"
+_META_KEY = "__meta__"
+
+
+def save_checkpoint(
+    path: str,
+    arrays: Dict[str, np.ndarray],
+    rngs: Dict[str, np.random.Generator],
+    meta: Optional[Dict[str, object]] = None,
+    compress: bool = False,
+):
+    """Atomically writes the arrays, generator states and metadata to path."""
+    entries = dict(arrays)
+    states = {name: rng.bit_generator.state for name, rng in rngs.items()}
+    entries[_RNG_KEY] = np.array(json.dumps(states))
+    entries[_META_KEY] = np.array(json.dumps(meta or {}))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        (np.savez_compressed if compress else np.savez)(f, **entries)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(
+    path: str,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, dict], Dict[str, object]]:
+    """arrays, generator states and metadata, as written by save_checkpoint."""
+    with np.load(path) as data:
+        arrays = {
+            name: data[name] for name in data.files if name not in (_RNG_KEY, _META_KEY)
+        }
+        states = json.loads(str(data[_RNG_KEY]))
+        meta = json.loads(str(data[_META_KEY]))
+    return arrays, states, meta
+
+
+def restore_generator(rng: np.random.Generator, state: dict) -> np.random.Generator:
+    """Puts rng into the saved state, its next numbers are those of the saved run."""
+    if state["bit_generator"] != type(rng.bit_generator).__name__:
+        raise ValueError("The checkpoint was written with " + state["bit_generator"])
+    rng.bit_generator.state = state
+    return rng
+
+
+class Checkpointer:
+    def __init__(
+        self,
+        path: str,
+        every_seconds: Optional[float] = 600.0,
+        every_steps: Optional[int] = None,
+        compress: bool = False,
+    ):
+        """
+        Saves to `path` whenever every_seconds have passed or every_steps steps
+        were done since the last save (None disables either condition).
+        """
+        self.path = path
+        self.every_seconds = every_seconds
+        self.every_steps = every_steps
+        self.compress = compress
+        self._last_time = time.monotonic()
+        self._last_step = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self):
+        self._last_time = time.monotonic()
+        arrays, states, meta = load_checkpoint(self.path)
+        self._last_step = int(meta.get("step", 0))
+        return arrays, states, meta
+
+    def due(self, step: int) -> bool:
+        if self.every_steps is not None and step - self._last_step >= self.every_steps:
+            return True
+        return (
+            self.every_seconds is not None
+            and time.monotonic() - self._last_time >= self.every_seconds
+        )
+
+    def save(
+        self,
+        step: int,
+        arrays: Dict[str, np.ndarray],
+        rngs: Dict[str, np.random.Generator],
+        meta: Optional[Dict[str, object]] = None,
+    ):
+        meta = dict(meta or {}, step=step)
+        save_checkpoint(self.path, arrays, rngs, meta, self.compress)
+        self._last_time = time.monotonic()
+        self._last_step = step
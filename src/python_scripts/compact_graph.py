@@ -0,0 +1,156 @@
+import numpy as np
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+from Node import Node
+
+
+"""
+Array backed graph used by the walk classes.
+
+A graph with n vertices and m (directed) edges is stored as
+
+- offsets: int64 array of length n + 1, the neighbors of v are
+  indices[offsets[v]:offsets[v + 1]]
+- indices: int32 array of length m (int64 for huge graphs)
+- x, y: optional float arrays with the drawing coordinates
+
+which is 12-16 bytes per vertex and 4 bytes per edge, compared to several
+hundred bytes per vertex for a Node object with a neighbor list plus the
+networkx graph and the pos dict. The networkx graph is only built when it is
+asked for, i.e. when a walk is drawn. For code written against the Node lists,
+graph.nodes[v] returns a Node (created on access) with the usual fields. These
+Nodes are frozen, since changing one would not change the graph; edit the
+arrays (or build a new CompactGraph) instead.
+"""
+
+
+def _index_dtype(num_nodes: int):
+    return np.int32 if num_nodes < 2**31 else np.int64
+
+
+class _FrozenNode(Node):
+    """A Node whose fields cannot be set, the neighbors are a tuple."""
+
+    __slots__ = ()
+
+    def __init__(self, id: int, x: float, y: float, neighbors: Tuple[int, ...]):
+        for name, value in zip(Node.__slots__, (id, x, y, neighbors)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Nodes of a CompactGraph are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Nodes of a CompactGraph are read-only")
+
+
+class NodeView:
+    """
+    Read-only sequence of the vertices as frozen Node objects, created on access
+    (a new object on every access).
+    """
+
+    def __init__(self, graph: "CompactGraph"):
+        self.graph = graph
+
+    def __len__(self) -> int:
+        return self.graph.num_nodes
+
+    def __getitem__(self, v: int) -> Node:
+        if v < 0 or v >= self.graph.num_nodes:
+            raise IndexError("Node id out of range")
+        x, y = self.graph.coordinates(v)
+        return _FrozenNode(v, x, y, tuple(self.graph.neighbors(v).tolist()))
+
+    def __iter__(self) -> Iterator[Node]:
+        for v in range(self.graph.num_nodes):
+            yield self[v]
+
+    def values(self) -> Iterator[Node]:
+        # Like the {id: node} dicts this replaces
+        return iter(self)
+
+
+class CompactGraph:
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        x: Optional[np.ndarray] = None,
+        y: Optional[np.ndarray] = None,
+    ):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.num_nodes = len(self.offsets) - 1
+        self.indices = np.asarray(indices, dtype=_index_dtype(self.num_nodes))
+        self.x = None if x is None else np.asarray(x, dtype=float)
+        self.y = None if y is None else np.asarray(y, dtype=float)
+        self.nodes = NodeView(self)
+        self._nx_graph = None
+
+    @classmethod
+    def from_nodes(cls, nodes: Sequence[Node]) -> "CompactGraph":
+        """From Node objects with the ids 0, ..., n - 1 (in any order)."""
+        nodes = sorted(nodes, key=lambda node: node.id)
+        if [node.id for node in nodes] != list(range(len(nodes))):
+            raise ValueError("Node ids must be 0, ..., n - 1")
+        x = np.array([node.x for node in nodes], dtype=float)
+        y = np.array([node.y for node in nodes], dtype=float)
+        return cls.from_neighbors([node.neighbors for node in nodes], x, y)
+
+    @classmethod
+    def from_neighbors(
+        cls,
+        neighbors: Sequence[Sequence[int]],
+        x: Optional[np.ndarray] = None,
+        y: Optional[np.ndarray] = None,
+    ) -> "CompactGraph":
+        offsets = np.zeros(len(neighbors) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(nbrs) for nbrs in neighbors])
+        indices = np.fromiter(
+            (v for nbrs in neighbors for v in nbrs),
+            dtype=_index_dtype(len(neighbors)),
+            count=offsets[-1],
+        )
+        return cls(offsets, indices, x, y)
+
+    @classmethod
+    def from_table(
+        cls,
+        table: np.ndarray,
+        x: Optional[np.ndarray] = None,
+        y: Optional[np.ndarray] = None,
+    ) -> "CompactGraph":
+        """From an (n, k) array whose row v holds the k neighbors of v."""
+        num_nodes, degree = table.shape
+        offsets = np.arange(num_nodes + 1, dtype=np.int64) * degree
+        return cls(offsets, table.ravel(), x, y)
+
+    def neighbors(self, v: int) -> np.ndarray:
+        """Neighbors of v, as a view into `indices`."""
+        return self.indices[self.offsets[v] : self.offsets[v + 1]]
+
+    def degree(self, v: int) -> int:
+        return int(self.offsets[v + 1] - self.offsets[v])
+
+    def coordinates(self, v: int) -> Tuple[float, float]:
+        if self.x is None:
+            return 0.0, 0.0
+        return float(self.x[v]), float(self.y[v])
+
+    def positions(self) -> Optional[Dict[int, Tuple[float, float]]]:
+        """The pos dict networkx draws with, None if there are no coordinates."""
+        if self.x is None:
+            return None
+        return dict(enumerate(zip(self.x.tolist(), self.y.tolist())))
+
+    def to_networkx(self):
+        """networkx graph with the same edges, built on the first call only."""
+        if self._nx_graph is None:
+            # Imported here, headless runs never need networkx
+            import networkx as nx
+
+            rows = np.repeat(np.arange(self.num_nodes), np.diff(self.offsets))
+            graph = nx.Graph()
+            graph.add_nodes_from(range(self.num_nodes))
+            graph.add_edges_from(zip(rows.tolist(), self.indices.tolist()))
+            self._nx_graph = graph
+        return self._nx_graph
@@ -0,0 +1,146 @@
+import numpy as np
+from typing import Dict, Optional, Sequence
+from transition_kernel import TransitionKernel
+
+
+"""
+Cover times and hitting times of simple and RW_lambda walks, by simulation.
+
+Many walkers are moved at once with TransitionKernel.step_many. Each walker has
+a slot with
+
+- its visited set as a packed bitset (one bit per vertex, N / 8 bytes, so 125 kB
+  for a million vertices) and the number of visited vertices,
+- the step at which it first hit each of the target vertices (-1 if not yet).
+
+A walker is done once it has visited every vertex (if cover is True) and hit all
+targets, or after max_steps steps. Its slot is then given to the next walker, and
+when no walkers are left the batch shrinks, so no work is spent on walkers that
+are done. The number of slots is chosen such that the bitsets fit into
+memory_budget bytes, so the memory stays fixed for any number of walkers.
+
+Hitting times count from step 0, i.e. a target equal to the start is hit at 0.
+"""
+
+_WORD_BITS = 64
+
+
+def estimate_cover_times(
+    kernel: TransitionKernel,
+    start_node: int,
+    walkers: int,
+    targets: Sequence[int] = (),
+    cover: bool = True,
+    max_steps: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+    memory_budget: int = 1 << 27,
+) -> Dict[str, np.ndarray]:
+    """
+    Runs `walkers` walks from `start_node`. Returns "cover_times" (if cover is
+    True, shape (walkers,)) and "hitting_times" (shape (walkers, len(targets))),
+    with -1 for walkers that did not finish within max_steps.
+    Note that RW_lambda needs a huge number of steps to cover far away vertices.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_nodes = kernel.num_nodes
+    targets = np.asarray(targets, dtype=np.int64)
+    if not cover and not len(targets):
+        raise ValueError("Nothing to estimate, give targets or set cover=True")
+    max_steps = np.iinfo(np.int64).max if max_steps is None else max_steps
+
+    words = (num_nodes + _WORD_BITS - 1) // _WORD_BITS if cover else 0
+    slots = min(walkers, max(1, memory_budget // max(1, 8 * words)))
+    visited = np.zeros(slots * words, dtype=np.uint64)
+    counts = np.zeros(slots, dtype=np.int64)
+    nodes = np.full(slots, start_node, dtype=np.int64)
+    born = np.zeros(slots, dtype=np.int64)
+    walker_of = np.arange(slots)
+    # Targets not yet hit, per slot
+    remaining = np.zeros(slots, dtype=np.int64)
+
+    cover_times = np.full(walkers if cover else 0, -1, dtype=np.int64)
+    hitting_times = np.full((walkers, len(targets)), -1, dtype=np.int64)
+    target_index = np.full(num_nodes, -1, dtype=np.int32)
+    target_index[targets] = np.arange(len(targets))
+
+    def mark(active: np.ndarray, step: int) -> np.ndarray:
+        """Records the current nodes of the active slots, True where done."""
+        current = nodes[active]
+        done = np.ones(len(active), dtype=bool)
+        if cover:
+            positions = active * words + current // _WORD_BITS
+            bits = np.left_shift(np.uint64(1), (current % _WORD_BITS).astype(np.uint64))
+            new = (visited[positions] & bits) == 0
+            visited[positions[new]] |= bits[new]
+            counts[active[new]] += 1
+            done &= counts[active] == num_nodes
+        if len(targets):
+            index = target_index[current]
+            hit = np.flatnonzero(index >= 0)
+            rows, cols = walker_of[active[hit]], index[hit]
+            first = hitting_times[rows, cols] < 0
+            hitting_times[rows[first], cols[first]] = step - born[active[hit[first]]]
+            remaining[active[hit[first]]] -= 1
+            done &= remaining[active] == 0
+        return done
+
+    def start(slot_ids: np.ndarray, step: int):
+        if cover:
+            visited.reshape(slots, words)[slot_ids] = 0
+        counts[slot_ids] = 0
+        nodes[slot_ids] = start_node
+        born[slot_ids] = step
+        remaining[slot_ids] = len(targets)
+
+    next_walker = slots
+    active = np.arange(slots)
+    start(active, 0)
+    step = 0
+    done = mark(active, step)
+    while len(active):
+        if done.any():
+            finished = active[done]
+            if cover:
+                covered = counts[finished] == num_nodes
+                cover_times[walker_of[finished[covered]]] = (
+                    step - born[finished[covered]]
+                )
+            # Free slots go to the walkers that have not started yet
+            refill = finished[: max(0, walkers - next_walker)]
+            walker_of[refill] = np.arange(next_walker, next_walker + len(refill))
+            next_walker += len(refill)
+            start(refill, step)
+            active = np.concatenate([active[~done], refill])
+            if len(refill):
+                new_done = mark(refill, step)
+                # Walkers that are done at step 0 (e.g. a graph with one vertex)
+                done = np.concatenate(
+                    [np.zeros(len(active) - len(refill), bool), new_done]
+                )
+                continue
+            if not len(active):
+                break
+
+        nodes[active] = kernel.step_many(nodes[active], rng)
+        step += 1
+        done = mark(active, step)
+        done |= step - born[active] >= max_steps
+
+    return {"cover_times": cover_times, "hitting_times": hitting_times}
+
+
+def summarize(times: np.ndarray, z: float = 1.96) -> Dict[str, float]:
+    """Mean with a normal confidence interval over the walkers that finished."""
+    finished = times[times >= 0].astype(float)
+    mean = finished.mean() if len(finished) else np.nan
+    half = (
+        z * finished.std(ddof=1) / np.sqrt(len(finished))
+        if len(finished) > 1
+        else np.nan
+    )
+    return {
+        "mean": mean,
+        "lower": mean - half,
+        "upper": mean + half,
+        "finished": len(finished) / max(1, len(times)),
+    }
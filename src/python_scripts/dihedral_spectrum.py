@@ -0,0 +1,184 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+from transition_kernel import TransitionKernel
+
+
+"""
+Spectrum of random walks on the dihedral group D_n via its representations.
+
+The elements of D_n are the rotations a^i (nodes 0, ..., n - 1 in the Dn script)
+and the reflections a^i b (nodes n, ..., 2n - 1). A walk that steps from g to gs
+with s drawn from a fixed law mu commutes with the rotation g -> ag, which shifts
+both halves of the nodes by one. Its transition matrix therefore consists of four
+circulant n x n blocks
+
+    P = [[R, S],    R[x]: rotation i -> rotation i + x,  S[x]: -> reflection i + x
+         [T, U]]    T[x]: reflection i -> rotation i + x, U[x]: -> reflection i + x
+
+and the discrete Fourier transform over the rotation index splits it into n
+blocks of size 2 x 2,
+
+    B_k = [[R^(k), S^(k)], [T^(k), U^(k)]],   h^(k) = sum_x h[x] e^(-2 pi i k x / n).
+
+For a walk on D_n, B_k is the Fourier transform of mu at the 2-dimensional
+representation rho_k (a -> diag(w^k, w^-k), b -> [[0, 1], [1, 0]]), which is
+irreducible for k != 0, n/2 and equivalent to rho_(n-k). For k = 0 (and k = n/2)
+it splits into two of the 1-dimensional representations. The spectrum of P is
+the union of the spectra of the B_k, so it costs four FFTs and n 2 x 2 problems
+instead of a dense 2n x 2n eigensolver, and n in the millions is no problem.
+
+The same holds for every walk that is invariant under this rotation, e.g. the
+directed graph drawn by on_cayley_graph_Dn.py, which from_kernel reads off a
+TransitionKernel. RW_lambda is not invariant (its weights depend on the distance
+to the identity) and is rejected.
+"""
+
+
+def _multiply(A: Tuple[np.ndarray, ...], B: Tuple[np.ndarray, ...]):
+    # Stacks of 2 x 2 matrices as their four (contiguous) entry arrays, which is
+    # much faster than np.matmul on an (n, 2, 2) array
+    a, b, c, d = A
+    e, f, g, h = B
+    return a * e + b * g, a * f + b * h, c * e + d * g, c * f + d * h
+
+
+class DihedralSpectrum:
+    def __init__(self, R: np.ndarray, S: np.ndarray, T: np.ndarray, U: np.ndarray):
+        """The four step laws as above, arrays of length n indexed by the shift x."""
+        self.n = len(R)
+        self.blocks = np.empty((self.n, 2, 2), dtype=complex)
+        for (row, col), law in zip(((0, 0), (0, 1), (1, 0), (1, 1)), (R, S, T, U)):
+            self.blocks[:, row, col] = np.fft.fft(np.asarray(law, dtype=float))
+        self._eigenvalues = None
+
+    @classmethod
+    def from_steps(
+        cls, n: int, steps: Dict[Tuple[int, int], float], lazy: float = 0.0
+    ) -> "DihedralSpectrum":
+        """
+        Walk g -> gs on D_n, where s = a^x b^f is chosen with probability
+        steps[(x, f)] (times 1 - lazy; with probability lazy the walk stays).
+        """
+        R, S, T, U = (np.zeros(n) for _ in range(4))
+        for (x, f), p in steps.items():
+            p *= 1.0 - lazy
+            if f % 2 == 0:
+                # a^i a^x = a^(i + x),  a^i b a^x = a^(i - x) b
+                R[x % n] += p
+                U[-x % n] += p
+            else:
+                # a^i a^x b = a^(i + x) b,  a^i b a^x b = a^(i - x)
+                S[x % n] += p
+                T[-x % n] += p
+        R[0] += lazy
+        U[0] += lazy
+        return cls(R, S, T, U)
+
+    @classmethod
+    def simple(
+        cls,
+        n: int,
+        generators: Sequence[Tuple[int, int]] = ((1, 0), (-1, 0), (0, 1)),
+        lazy: float = 0.0,
+    ) -> "DihedralSpectrum":
+        """
+        Simple walk on the Cayley graph of D_n with generators a^x b^f, by default
+        {a, a^-1, b}, whose undirected graph is the one the Dn script draws.
+        """
+        steps: Dict[Tuple[int, int], float] = {}
+        for x, f in generators:
+            key = (x % n, f % 2)
+            steps[key] = steps.get(key, 0.0) + 1.0 / len(generators)
+        return cls.from_steps(n, steps, lazy)
+
+    @classmethod
+    def from_kernel(cls, kernel: TransitionKernel, n: int) -> "DihedralSpectrum":
+        """
+        E.g. DihedralSpectrum.from_kernel(graph_walk.get_kernel(), graph_walk.n) for
+        the simple walk of the Dn script. Raises ValueError if the transition law
+        is not invariant under the rotation v -> v + 1 (mod n, on both halves).
+        """
+        if kernel.num_nodes != 2 * n:
+            raise ValueError("A walk on D_n has 2n nodes")
+        sources = np.repeat(np.arange(kernel.num_nodes), kernel.degrees)
+        targets = np.asarray(kernel.indices, dtype=np.int64)
+        probs = kernel.transition_probabilities()
+        # Multi-edges are summed, as in the transition matrix
+        keys, inverse = np.unique(sources * (2 * n) + targets, return_inverse=True)
+        probs = np.bincount(inverse, weights=probs)
+        sources, targets = keys // (2 * n), keys % (2 * n)
+        blocks = 2 * (sources >= n) + (targets >= n)
+        shifts = (targets - sources) % n
+        laws = np.zeros((4, n))
+        # The laws are read off the rows of node 0 and node n ...
+        first = (sources == 0) | (sources == n)
+        laws[blocks[first], shifts[first]] = probs[first]
+        # ... and every other row has to agree with them
+        if not np.allclose(probs, laws[blocks, shifts], rtol=1e-9, atol=1e-12):
+            raise ValueError("The walk is not invariant under rotations")
+        return cls(*laws)
+
+    def eigenvalues(self) -> np.ndarray:
+        """(n, 2) array, the eigenvalues of B_k in row k."""
+        if self._eigenvalues is None:
+            B = self.blocks
+            half_trace = (B[:, 0, 0] + B[:, 1, 1]) / 2
+            det = B[:, 0, 0] * B[:, 1, 1] - B[:, 0, 1] * B[:, 1, 0]
+            root = np.sqrt(half_trace**2 - det)
+            self._eigenvalues = np.column_stack([half_trace + root, half_trace - root])
+        return self._eigenvalues
+
+    def _nontrivial_eigenvalues(self) -> np.ndarray:
+        # All but the eigenvalue 1 of the constant functions, which lies in B_0
+        values = self.eigenvalues().ravel()
+        trivial = np.argmin(np.abs(values[:2] - 1.0))
+        return np.delete(values, trivial)
+
+    def spectral_gap(self) -> float:
+        """1 - the largest real part of a non-trivial eigenvalue."""
+        return float(1.0 - self._nontrivial_eigenvalues().real.max())
+
+    def absolute_spectral_gap(self) -> float:
+        """1 - the largest modulus of a non-trivial eigenvalue (0 if periodic)."""
+        return float(1.0 - np.abs(self._nontrivial_eigenvalues()).max())
+
+    def relaxation_time(self) -> float:
+        """1 / absolute spectral gap, inf for periodic or reducible walks."""
+        gap = self.absolute_spectral_gap()
+        return 1.0 / gap if gap > 1e-15 else np.inf
+
+    def return_probability(self, steps: int, start: int = 0) -> float:
+        """
+        P^t[start, start]. By the rotation invariance it is the same for all
+        rotations (start < n) and for all reflections (start >= n), namely
+        1/n sum_k (B_k^t)[c, c] with c = 0 or 1.
+        """
+        c = int(start >= self.n)
+        return float(self._block_powers(int(steps))[:, c, c].real.mean())
+
+    def _block_powers(self, steps: int) -> np.ndarray:
+        """B_k^steps for all k, by repeated squaring."""
+        ones, zeros = np.ones(self.n, dtype=complex), np.zeros(self.n, dtype=complex)
+        result = (ones, zeros, zeros, ones)
+        square = tuple(self.blocks[:, i, j].copy() for i in range(2) for j in range(2))
+        while steps:
+            if steps & 1:
+                result = _multiply(result, square)
+            steps >>= 1
+            if steps:
+                square = _multiply(square, square)
+        return np.stack(result, axis=1).reshape(self.n, 2, 2)
+
+    def return_probabilities(self, steps: int, start: int = 0) -> np.ndarray:
+        """P^t[start, start] for t = 0, ..., steps, in O(n) per step."""
+        coset = int(start >= self.n)
+        a, b, c, d = (self.blocks[:, i, j].copy() for i in range(2) for j in range(2))
+        # Column `coset` of B_k^t for all k
+        x = np.full(self.n, 1.0 - coset, dtype=complex)
+        y = np.full(self.n, float(coset), dtype=complex)
+        probs = np.empty(steps + 1)
+        probs[0] = 1.0
+        for t in range(1, steps + 1):
+            x, y = a * x + b * y, c * x + d * y
+            probs[t] = (y if coset else x).real.mean()
+        return probs
@@ -0,0 +1,158 @@
+import numpy as np
+from typing import Callable, Optional, Sequence
+
+
+"""
+Lumping a simple or RW_lambda walk onto the distance layers (spheres) of a graph.
+
+For RW_lambda the weight of a neighbor only depends on its distance to the root,
+and neighbors of a node at distance d are at distance d - 1, d or d + 1. So if all
+nodes of a layer have the same numbers of neighbors in the layers d - 1, d and
+d + 1 (which we call sphere transition counts), the distance of the walk is itself
+a Markov chain: a birth-death chain on {0, ..., radius}. That is the case e.g. for
+Z/nZ and for trees, but not for every Cayley graph (D_n with {a, a^-1, b} is not),
+which is why the counts are checked before lumping.
+
+Recurrence and escape statistics of the birth-death chain cost O(radius) instead
+of O(|G|).
+"""
+
+
+def sphere_transition_counts(
+    offsets: np.ndarray, indices: np.ndarray, distances: np.ndarray
+) -> np.ndarray:
+    """(num_nodes, 3) array: numbers of neighbors at distance d - 1, d and d + 1."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    degrees = np.diff(offsets)
+    rows = np.repeat(np.arange(len(degrees)), degrees)
+    delta = distances[indices].astype(np.int64) - distances[rows]
+    if np.any(np.abs(delta) > 1):
+        raise ValueError("Distances must change by at most 1 along an edge")
+    counts = np.zeros((len(degrees), 3), dtype=np.int64)
+    np.add.at(counts, (rows, delta + 1), 1)
+    return counts
+
+
+class LumpedChain:
+    def __init__(self, down: np.ndarray, stay: np.ndarray, up: np.ndarray):
+        """Birth-death chain with the given probabilities per layer 0, ..., radius."""
+        self.down = np.asarray(down, dtype=float)
+        self.stay = np.asarray(stay, dtype=float)
+        self.up = np.asarray(up, dtype=float)
+        self.radius = len(self.up) - 1
+
+    @classmethod
+    def from_counts(
+        cls, counts: Sequence[Sequence[int]], lambd: Optional[float] = None
+    ):
+        """
+        counts[d] = (neighbors at d - 1, at d, at d + 1) for a node in layer d.
+        E.g. the free group of rank r has counts (0, 0, 2r) and then (1, 0, 2r - 1)
+        in every further layer, which gives the chain on a ball of any radius.
+        """
+        counts = np.asarray(counts, dtype=float)
+        # Weights lambd^(-(d - 1)), lambd^(-d), lambd^(-(d + 1)), divided by lambd^(-d)
+        scale = np.ones(3) if lambd is None else np.array([lambd, 1.0, 1.0 / lambd])
+        weights = counts * scale
+        probs = weights / weights.sum(axis=1, keepdims=True)
+        return cls(probs[:, 0], probs[:, 1], probs[:, 2])
+
+    @classmethod
+    def from_graph(
+        cls,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        distances: np.ndarray,
+        lambd: Optional[float] = None,
+    ) -> "LumpedChain":
+        """Raises ValueError if the distance layers are not exactly lumpable."""
+        distances = np.asarray(distances)
+        counts = sphere_transition_counts(offsets, indices, distances)
+        radius = int(distances.max())
+        layer_counts = np.zeros((radius + 1, 3), dtype=np.int64)
+        layer_counts[distances] = counts
+        mismatch = np.flatnonzero(np.any(counts != layer_counts[distances], axis=1))
+        if len(mismatch):
+            d = int(distances[mismatch[0]])
+            raise ValueError(
+                "Layer %d is not lumpable: its nodes have different sphere transition counts"
+                % d
+            )
+        return cls.from_counts(layer_counts, lambd)
+
+    @classmethod
+    def from_neighbors(
+        cls,
+        neighbors: Sequence[Sequence[int]],
+        distance: Callable[[int], int],
+        lambd: Optional[float] = None,
+    ) -> "LumpedChain":
+        """E.g. LumpedChain.from_neighbors([n.neighbors for n in walk.nodes], ...)"""
+        offsets = np.zeros(len(neighbors) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(nbrs) for nbrs in neighbors])
+        indices = np.fromiter(
+            (v for nbrs in neighbors for v in nbrs), dtype=np.int64, count=offsets[-1]
+        )
+        distances = np.array([distance(v) for v in range(len(neighbors))])
+        return cls.from_graph(offsets, indices, distances, lambd)
+
+    def simulate(
+        self,
+        steps: int,
+        walkers: int = 1,
+        rng: Optional[np.random.Generator] = None,
+        start_layer: int = 0,
+    ) -> np.ndarray:
+        """Layers of `walkers` independent walks, shape (walkers, steps + 1)."""
+        rng = np.random.default_rng() if rng is None else rng
+        down = self.down
+        not_up = self.down + self.stay
+        layers = np.empty((walkers, steps + 1), dtype=np.int64)
+        current = np.full(walkers, start_layer, dtype=np.int64)
+        layers[:, 0] = current
+        for t in range(1, steps + 1):
+            u = rng.random(walkers)
+            current = current - (u < down[current]) + (u >= not_up[current])
+            layers[:, t] = current
+        return layers
+
+    def escape_probability(self, radius: int) -> float:
+        """Probability to reach layer `radius` before returning to layer 0 (the root)."""
+        # Gambler's ruin for birth-death chains: from layer 1 the probability to
+        # hit `radius` before 0 is 1 / sum_k prod_{j=1..k} down[j] / up[j]
+        ratios = self.down[1:radius] / self.up[1:radius]
+        terms = np.concatenate([[1.0], np.cumprod(ratios)])
+        return float(self.up[0] / terms.sum())
+
+    def return_probability(self, radius: int) -> float:
+        """Probability to return to the root before reaching layer `radius`."""
+        return 1.0 - self.escape_probability(radius)
+
+    def escape_probabilities(self) -> np.ndarray:
+        """escape_probability(R) for R = 1, ..., radius in one pass."""
+        ratios = self.down[1 : self.radius] / self.up[1 : self.radius]
+        terms = np.concatenate([[1.0], np.cumprod(ratios)])
+        return self.up[0] / np.cumsum(terms)
+
+    def stationary_distribution(self) -> np.ndarray:
+        """Stationary distribution of the layers (for a finite graph)."""
+        # Detailed balance pi[d] up[d] = pi[d + 1] down[d + 1], in log space
+        log_pi = np.concatenate(
+            [[0.0], np.cumsum(np.log(self.up[:-1]) - np.log(self.down[1:]))]
+        )
+        pi = np.exp(log_pi - log_pi.max())
+        return pi / pi.sum()
+
+    def expected_return_time(self) -> float:
+        """Expected time of the first return to the root on a finite graph."""
+        return float(1.0 / self.stationary_distribution()[0])
+
+    def expected_hitting_times(self) -> np.ndarray:
+        """Expected number of steps from the root until layer d is first reached."""
+        # T[d] = expected time from d to d + 1 = (1 + down[d] * T[d - 1]) / up[d]
+        crossing = np.empty(self.radius)
+        previous = 0.0
+        for d in range(self.radius):
+            previous = (1.0 + self.down[d] * previous) / self.up[d]
+            crossing[d] = previous
+        return np.concatenate([[0.0], np.cumsum(crossing)])
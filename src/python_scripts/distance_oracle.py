@@ -0,0 +1,118 @@
+import numpy as np
+import scipy.sparse as sp
+from collections import OrderedDict
+from scipy.sparse.csgraph import dijkstra
+from typing import Callable, Dict, Hashable, List, Sequence
+
+
+"""
+Word metric distances to the identity, computed by BFS instead of by a formula.
+
+- DistanceOracle: finite graphs. One BFS from the root (scipy's csgraph) fills
+  a dense int array, after which every lookup is O(1). Edges are used in both
+  directions, i.e. the distances are those of the undirected Cayley graph.
+- FrontierDistanceOracle: infinite groups given by hashable elements, generators
+  (closed under inverses) and a multiplication. The ball around the identity is
+  grown layer by layer as far as needed, up to max_ball elements. For an element
+  g outside of the ball, which has radius R, a BFS from g is run until it first
+  hits the sphere of radius R, at depth k. Every path from the identity to g
+  crosses that sphere, so |g| = R + k. These results are kept in an LRU cache of
+  cache_size entries.
+"""
+
+
+class DistanceOracle:
+    def __init__(self, distances: np.ndarray):
+        self.distances = np.asarray(distances)
+
+    @classmethod
+    def from_graph(
+        cls, offsets: np.ndarray, indices: np.ndarray, root: int = 0
+    ) -> "DistanceOracle":
+        num_nodes = len(offsets) - 1
+        adjacency = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int8), indices, offsets),
+            shape=(num_nodes, num_nodes),
+        )
+        # BFS in compiled code, also fast for graphs with millions of layers
+        distances = dijkstra(adjacency, directed=False, unweighted=True, indices=root)
+        distances[np.isinf(distances)] = -1
+        return cls(distances.astype(np.int32))
+
+    def __call__(self, v: int) -> int:
+        # A Python int, so that lambd ** -d also works for integer lambd
+        return int(self.distances[v])
+
+    def __len__(self) -> int:
+        return len(self.distances)
+
+
+class FrontierDistanceOracle:
+    def __init__(
+        self,
+        identity: Hashable,
+        generators: Sequence[Hashable],
+        multiply: Callable[[Hashable, Hashable], Hashable],
+        max_ball: int = 1 << 20,
+        cache_size: int = 1 << 16,
+    ):
+        """The generating set must be closed under inverses."""
+        self.generators = list(generators)
+        self.multiply = multiply
+        self.max_ball = max_ball
+        self.cache_size = cache_size
+        self.ball: Dict[Hashable, int] = {identity: 0}
+        self.frontier: List[Hashable] = [identity]
+        self.radius = 0
+        self.cache: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def _grow(self):
+        """Adds the sphere of radius + 1 to the ball."""
+        layer = []
+        for g in self.frontier:
+            for s in self.generators:
+                h = self.multiply(g, s)
+                if h not in self.ball:
+                    self.ball[h] = self.radius + 1
+                    layer.append(h)
+        self.frontier = layer
+        self.radius += 1
+
+    def _distance_from_sphere(self, g: Hashable) -> int:
+        # BFS from g, which lies outside the ball, until the outer sphere is hit
+        seen = {g}
+        layer = [g]
+        depth = 0
+        while True:
+            depth += 1
+            next_layer = []
+            for h in layer:
+                for s in self.generators:
+                    k = self.multiply(h, s)
+                    if self.ball.get(k) == self.radius:
+                        return self.radius + depth
+                    if k not in seen:
+                        seen.add(k)
+                        next_layer.append(k)
+            layer = next_layer
+
+    def __call__(self, g: Hashable) -> int:
+        d = self.ball.get(g)
+        if d is not None:
+            return d
+        d = self.cache.get(g)
+        if d is not None:
+            self.cache.move_to_end(g)
+            return d
+        while len(self.ball) < self.max_ball and self.frontier:
+            self._grow()
+            d = self.ball.get(g)
+            if d is not None:
+                return d
+        if not self.frontier:
+            raise ValueError("The element is not in the group generated")
+        d = self._distance_from_sphere(g)
+        self.cache[g] = d
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return d
@@ -0,0 +1,274 @@
+import json
+import os
+import warnings
+import numpy as np
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+from compact_graph import CompactGraph
+
+
+"""
+Loading large graphs into a CompactGraph.
+
+- Edge lists (one "u v" pair per line, further columns such as weights are
+  ignored, lines starting with # or % are comments) are read in blocks of
+  chunk_bytes bytes, and each block is parsed by numpy in one call.
+- GraphML files are streamed with iterparse, so the XML tree is never held in
+  memory. Node ids may be arbitrary strings, they are numbered in order of
+  appearance. Node attributes named x and y are used as coordinates.
+- A parsed graph can be saved as a directory of .npy files (or one .npz file).
+  The directory is loaded with memory maps, so opening a graph with tens of
+  millions of edges takes milliseconds and only the touched pages are read.
+
+load_graph picks the loader from the file name and by default keeps such a
+cache next to a text file, which is reused as long as it is newer than the file
+and was built with the same loader options.
+"""
+
+_COMMENTS = (b"#", b"%")
+# Loader options that change the parsed graph (the chunk sizes do not), with
+# their defaults, per format. They are stored with the cache of load_graph.
+# GraphML files say themselves whether they are directed.
+_GRAPH_OPTIONS = {
+    "edges": {"directed": False, "relabel": False},
+    "graphml": {},
+}
+
+
+def csr_from_edges(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    num_nodes: Optional[int] = None,
+    directed: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """offsets and indices for the given edges (both directions if undirected)."""
+    if not directed:
+        sources, targets = (
+            np.concatenate([sources, targets]),
+            np.concatenate([targets, sources]),
+        )
+    if num_nodes is None:
+        num_nodes = int(sources.max()) + 1 if len(sources) else 0
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    dtype = np.int32 if num_nodes < 2**31 else np.int64
+    indices = targets[np.argsort(sources, kind="stable")].astype(dtype)
+    return offsets, indices
+
+
+def _parse_edge_block(block: bytes, columns: int) -> np.ndarray:
+    if any(c in block for c in _COMMENTS):
+        lines = block.split(b"\n")
+        block = b"\n".join(
+            line for line in lines if not line.lstrip().startswith(_COMMENTS)
+        )
+    with warnings.catch_warnings():
+        # numpy only warns about text it cannot parse
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            # Extra columns may hold float weights, ids are exact as floats up to 2^53
+            dtype = np.int64 if columns == 2 else np.float64
+            values = np.fromstring(block.decode("ascii"), dtype=dtype, sep=" ")
+        except (DeprecationWarning, ValueError):
+            raise ValueError("Could not parse the edge list as numbers")
+    if len(values) % columns:
+        raise ValueError("Every line of an edge list needs %d columns" % columns)
+    return values.reshape(-1, columns)[:, :2].astype(np.int64)
+
+
+def _count_columns(path: str) -> int:
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith(_COMMENTS):
+                return len(line.split())
+    return 2
+
+
+def load_edge_list(
+    path: str,
+    directed: bool = False,
+    relabel: bool = False,
+    chunk_bytes: int = 1 << 26,
+) -> CompactGraph:
+    """
+    Node ids are used as they are (ids 0, ..., max id) unless relabel is True, in
+    which case the distinct ids are mapped to 0, ..., n - 1 in increasing order.
+    """
+    columns = _count_columns(path)
+    sources: List[np.ndarray] = []
+    targets: List[np.ndarray] = []
+    rest = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            # Lines that are cut by the block end are parsed with the next block
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                rest += block
+                continue
+            edges = _parse_edge_block(rest + block[:cut], columns)
+            rest = block[cut:]
+            sources.append(edges[:, 0].copy())
+            targets.append(edges[:, 1].copy())
+    if rest.strip():
+        edges = _parse_edge_block(rest, columns)
+        sources.append(edges[:, 0].copy())
+        targets.append(edges[:, 1].copy())
+
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    num_nodes = None
+    if relabel:
+        ids, inverse = np.unique(
+            np.concatenate([sources, targets]), return_inverse=True
+        )
+        sources, targets = inverse[: len(sources)], inverse[len(sources) :]
+        num_nodes = len(ids)
+    elif len(sources) and min(sources.min(), targets.min()) < 0:
+        raise ValueError("Negative node ids need relabel=True")
+    elif len(sources):
+        num_nodes = int(max(sources.max(), targets.max())) + 1
+    offsets, indices = csr_from_edges(sources, targets, num_nodes, directed)
+    return CompactGraph(offsets, indices)
+
+
+def load_graphml(path: str, chunk_edges: int = 1 << 20) -> CompactGraph:
+    """Edges of a directed GraphML graph are used as given, otherwise both ways."""
+    ids: Dict[str, int] = {}
+    keys: Dict[str, str] = {}
+    coords: Dict[str, List[float]] = {"x": [], "y": []}
+    directed = False
+    graph_elem = None
+    parsed = 0
+    sources: List[np.ndarray] = []
+    targets: List[np.ndarray] = []
+    buffer: List[int] = []
+
+    def node_id(name: str) -> int:
+        if name not in ids:
+            ids[name] = len(ids)
+            coords["x"].append(np.nan)
+            coords["y"].append(np.nan)
+        return ids[name]
+
+    def flush():
+        edges = np.array(buffer, dtype=np.int64).reshape(-1, 2)
+        sources.append(edges[:, 0])
+        targets.append(edges[:, 1])
+        buffer.clear()
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            if tag == "graph":
+                graph_elem = elem
+                directed = elem.get("edgedefault") == "directed"
+            continue
+        if tag == "key":
+            keys[elem.get("id")] = elem.get("attr.name")
+            continue
+        if tag == "node":
+            v = node_id(elem.get("id"))
+            for data in elem:
+                name = keys.get(data.get("key"))
+                if name in coords and data.text:
+                    coords[name][v] = float(data.text)
+        elif tag == "edge":
+            buffer.append(node_id(elem.get("source")))
+            buffer.append(node_id(elem.get("target")))
+            if len(buffer) >= 2 * chunk_edges:
+                flush()
+        else:
+            continue
+        # The parsed elements stay children of <graph> unless they are dropped
+        parsed += 1
+        if parsed % chunk_edges == 0:
+            graph_elem.clear()
+    flush()
+
+    offsets, indices = csr_from_edges(
+        np.concatenate(sources), np.concatenate(targets), len(ids), directed
+    )
+    x, y = np.array(coords["x"]), np.array(coords["y"])
+    if np.isnan(x).any() or np.isnan(y).any():
+        x = y = None
+    return CompactGraph(offsets, indices, x, y)
+
+
+def save_graph(graph: CompactGraph, path: str):
+    """Saves to the directory `path`, or to one file if path ends with .npz."""
+    arrays = {"offsets": graph.offsets, "indices": graph.indices}
+    if graph.x is not None:
+        arrays["x"] = graph.x
+        arrays["y"] = graph.y
+    if path.endswith(".npz"):
+        np.savez(path, **arrays)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in ("offsets", "indices", "x", "y"):
+        file = os.path.join(path, name + ".npy")
+        if name in arrays:
+            np.save(file, arrays[name])
+        elif os.path.exists(file):
+            os.remove(file)
+
+
+def load_saved_graph(path: str, mmap_mode: Optional[str] = "r") -> CompactGraph:
+    """Loads what save_graph wrote, a directory is opened as memory maps."""
+    if path.endswith(".npz"):
+        with np.load(path) as arrays:
+            return CompactGraph(
+                arrays["offsets"], arrays["indices"], arrays.get("x"), arrays.get("y")
+            )
+    arrays = {}
+    for name in ("offsets", "indices", "x", "y"):
+        file = os.path.join(path, name + ".npy")
+        arrays[name] = (
+            np.load(file, mmap_mode=mmap_mode) if os.path.exists(file) else None
+        )
+    return CompactGraph(arrays["offsets"], arrays["indices"], arrays["x"], arrays["y"])
+
+
+def load_graph(path: str, cache: bool = True, **kwargs) -> CompactGraph:
+    """
+    Loads an edge list, a .graphml file or a saved graph (.npz or a directory).
+    For text files the parsed graph is cached in the directory path + ".graph",
+    which is rebuilt when the file is newer or the options differ.
+    """
+    if path.endswith(".npz") or os.path.isdir(path):
+        return load_saved_graph(path)
+    cache_path = path + ".graph"
+    cached = os.path.join(cache_path, "offsets.npy")
+    options_file = os.path.join(cache_path, "options.json")
+    fmt = "graphml" if path.endswith(".graphml") else "edges"
+    if fmt == "graphml":
+        ignored = set(_GRAPH_OPTIONS["edges"]) & set(kwargs)
+        if ignored:
+            raise ValueError("GraphML files do not take " + ", ".join(sorted(ignored)))
+    options = {
+        name: kwargs.get(name, value) for name, value in _GRAPH_OPTIONS[fmt].items()
+    }
+    if (
+        cache
+        and os.path.exists(cached)
+        and os.path.exists(options_file)
+        and os.path.getmtime(cached) >= os.path.getmtime(path)
+    ):
+        with open(options_file) as f:
+            if json.load(f) == options:
+                return load_saved_graph(cache_path)
+    if fmt == "graphml":
+        graph = load_graphml(path, **kwargs)
+    else:
+        graph = load_edge_list(path, **kwargs)
+    if cache:
+        # The options are written last, so an interrupted save is never reused
+        if os.path.exists(options_file):
+            os.remove(options_file)
+        save_graph(graph, cache_path)
+        with open(options_file, "w") as f:
+            json.dump(options, f)
+    return graph
@@ -0,0 +1,145 @@
+import time
+import networkx as nx
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FFMpegWriter, FuncAnimation, PillowWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from typing import Dict, Iterable, Optional, Tuple
+from instrumentation import Instrumentation
+
+
+"""
+Animation of a walk on a graph without redrawing the graph in every frame.
+
+The edges, the nodes and the labels are drawn once and make up the static
+background. On top of it there are two animated artists: the visited nodes
+(orange) and the current node (red). A frame only moves these two artists, and
+with blitting matplotlib restores the cached background and redraws just them,
+so the cost of a frame does not depend on the size of the graph.
+
+The positions of the visited nodes are kept in a preallocated buffer in order
+of their first visit, so marking a node as visited is O(1) as well.
+"""
+
+
+class GraphRenderer:
+    def __init__(
+        self,
+        graph: nx.Graph,
+        pos: Optional[Dict[int, Tuple[float, float]]] = None,
+        node_size: Optional[float] = None,
+        with_labels: Optional[bool] = None,
+        stats: Optional[Instrumentation] = None,
+    ):
+        """
+        By default node sizes shrink and labels are left out for large graphs,
+        where they would only cover each other. Without positions a spring layout
+        is computed.
+        """
+        self.graph = graph
+        self.pos = pos if pos is not None else nx.spring_layout(graph, seed=0)
+        self.node_ids = list(self.pos)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.coords = np.array([self.pos[node] for node in self.node_ids], dtype=float)
+        n = len(self.node_ids)
+        self.node_size = node_size or (500 if n <= 50 else max(5, 25000 / n))
+        self.with_labels = n <= 50 if with_labels is None else with_labels
+        # Frames and the time spent updating the artists are counted here
+        self.stats = stats
+
+    def _setup(self, ax):
+        """Draws the static graph and returns the (empty) animated artists."""
+        nx.draw_networkx_edges(self.graph, pos=self.pos, ax=ax)
+        nx.draw_networkx_nodes(
+            self.graph,
+            pos=self.pos,
+            ax=ax,
+            node_color="lightblue",
+            node_size=self.node_size,
+        )
+        if self.with_labels:
+            nx.draw_networkx_labels(self.graph, pos=self.pos, ax=ax)
+        ax.set_axis_off()
+
+        empty = np.empty((0, 2))
+        visited = ax.scatter(
+            empty[:, 0],
+            empty[:, 1],
+            s=self.node_size * 1.4,
+            c="orange",
+            zorder=3,
+            animated=True,
+        )
+        current = ax.scatter(
+            empty[:, 0],
+            empty[:, 1],
+            s=self.node_size * 1.4,
+            c="red",
+            zorder=4,
+            animated=True,
+        )
+        return visited, current
+
+    def animation(
+        self, path: Iterable[int], fig, ax, interval: float = 200, save_count=None
+    ) -> FuncAnimation:
+        """FuncAnimation with one frame per node of `path` (any iterable, also lazy)."""
+        visited, current = self._setup(ax)
+        buffer = np.empty_like(self.coords)
+        seen = np.zeros(len(self.node_ids), dtype=bool)
+        count = 0
+
+        def init():
+            return visited, current
+
+        def update(node):
+            nonlocal count
+            if self.stats is not None:
+                self.stats.count("frames")
+                start = time.perf_counter()
+            i = self.index[node]
+            if not seen[i]:
+                seen[i] = True
+                buffer[count] = self.coords[i]
+                count += 1
+                visited.set_offsets(buffer[:count])
+            current.set_offsets(self.coords[i : i + 1])
+            if self.stats is not None:
+                self.stats.add_time("rendering", time.perf_counter() - start)
+            return visited, current
+
+        return FuncAnimation(
+            fig,
+            update,
+            frames=iter(path),
+            init_func=init,
+            interval=interval,
+            blit=True,
+            repeat=False,
+            save_count=save_count,
+            cache_frame_data=False,
+        )
+
+    def show(self, path: Iterable[int], delay: float = 0.5):
+        """Shows the walk in a window, delay is the time between frames in seconds."""
+        fig, ax = plt.subplots()
+        anim = self.animation(path, fig, ax, interval=1000 * delay)
+        plt.show()
+        return anim
+
+    def save(self, path: Iterable[int], filename: str, fps: float = 5, dpi: int = 100):
+        """
+        Writes the walk to a video (e.g. .mp4, needs ffmpeg) or a .gif file. The
+        figure is not attached to any window, so this also works without a display.
+        """
+        path = list(path)
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        anim = self.animation(path, fig, ax, save_count=len(path))
+        if filename.endswith(".gif"):
+            writer = PillowWriter(fps=fps)
+        else:
+            writer = FFMpegWriter(fps=fps)
+        anim.save(filename, writer=writer, dpi=dpi)
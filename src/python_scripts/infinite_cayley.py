@@ -0,0 +1,357 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from cayley_graph import CayleyGraph
+
+
+"""
+Random walks on infinite Cayley graphs whose vertices are generated on demand.
+
+Nothing is built up front. The walker only carries its current group element in
+normal form, from which the distance to the identity is known:
+
+- free products of cyclic groups Z_m1 * ... * Z_mk (m = 0 stands for Z) as
+  alternating syllables a_i^e, with |a_i^e| = min(e, m_i - e) (or |e| for Z),
+- free groups F_r = Z * ... * Z, i.e. reduced words in run-length form,
+- Z^d as coordinate tuples with the L1 norm.
+
+Every state also maintains a 64-bit hash of its normal form that is updated in
+O(1) per step. Visited vertices are only remembered through these hashes, so a
+walk with drift away from the root uses memory proportional to the number of
+distinct vertices it visited (8 bytes each), not to the size of a ball.
+Two different vertices sharing a hash is possible but has probability ~2^-64
+per pair.
+
+For exact computations (e.g. effective resistances in electrical_network.py),
+ball() enumerates a ball around the identity as a finite CayleyGraph.
+"""
+
+_MASK = (1 << 64) - 1
+_BASE = 0x9E3779B97F4A7C15
+_BLOCK_SIZE = 1 << 16
+
+
+def _mix(x: int) -> int:
+    # splitmix64 finalizer, spreads small integers over all 64 bits
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+class SyllableWord:
+    """Normal form a_{i1}^{e1} a_{i2}^{e2} ... with i_j != i_{j+1}."""
+
+    __slots__ = ("factors", "exponents", "hashes", "distance")
+
+    def __init__(self):
+        self.factors: List[int] = []
+        self.exponents: List[int] = []
+        # hashes[j] is the hash of the first j syllables
+        self.hashes: List[int] = [0]
+        self.distance = 0
+
+    @property
+    def key(self) -> int:
+        return self.hashes[-1]
+
+    def copy(self) -> "SyllableWord":
+        word = SyllableWord()
+        word.factors = self.factors.copy()
+        word.exponents = self.exponents.copy()
+        word.hashes = self.hashes.copy()
+        word.distance = self.distance
+        return word
+
+
+class LatticePoint:
+    __slots__ = ("coords", "key", "distance")
+
+    def __init__(self, dim: int):
+        self.coords = [0] * dim
+        self.key = 0
+        self.distance = 0
+
+    def copy(self) -> "LatticePoint":
+        point = LatticePoint(0)
+        point.coords = self.coords.copy()
+        point.key = self.key
+        point.distance = self.distance
+        return point
+
+
+class FreeProduct:
+    def __init__(self, orders: Sequence[int]):
+        """
+        Z_{orders[0]} * Z_{orders[1]} * ..., where an order of 0 means Z. Factor i
+        contributes the generators a_i and a_i^-1 (just a_i if its order is 2).
+        """
+        if any(m == 1 or m < 0 for m in orders):
+            raise ValueError("Orders must be 0 (for Z) or at least 2")
+        self.orders = list(orders)
+        # Generator s acts as a_{gen_factor[s]}^{gen_sign[s]}
+        self.gen_factor: List[int] = []
+        self.gen_sign: List[int] = []
+        for i, m in enumerate(self.orders):
+            for sign in (1, -1) if m != 2 else (1,):
+                self.gen_factor.append(i)
+                self.gen_sign.append(sign)
+        self.num_generators = len(self.gen_factor)
+
+    def identity(self) -> SyllableWord:
+        return SyllableWord()
+
+    def _weight(self, factor: int, exponent: int) -> int:
+        m = self.orders[factor]
+        return abs(exponent) if m == 0 else min(exponent, m - exponent)
+
+    def _new_exponent(self, factor: int, exponent: int) -> int:
+        m = self.orders[factor]
+        return exponent if m == 0 else exponent % m
+
+    def _syllable_code(self, factor: int, exponent: int) -> int:
+        return _mix((factor << 40) ^ (exponent & 0xFFFFFFFFFF))
+
+    def distance_after(self, word: SyllableWord, s: int) -> int:
+        """Distance of word * s without changing word."""
+        factor = self.gen_factor[s]
+        if word.factors and word.factors[-1] == factor:
+            e = word.exponents[-1]
+            e_new = self._new_exponent(factor, e + self.gen_sign[s])
+            return word.distance - self._weight(factor, e) + self._weight(factor, e_new)
+        return word.distance + 1
+
+    def apply(self, word: SyllableWord, s: int):
+        """Replaces word by word * s, in O(1)."""
+        factor = self.gen_factor[s]
+        if word.factors and word.factors[-1] == factor:
+            e = word.exponents[-1]
+            e_new = self._new_exponent(factor, e + self.gen_sign[s])
+            word.distance += self._weight(factor, e_new) - self._weight(factor, e)
+            word.hashes.pop()
+            if e_new == 0:
+                word.factors.pop()
+                word.exponents.pop()
+                return
+            word.exponents[-1] = e_new
+        else:
+            e_new = self._new_exponent(factor, self.gen_sign[s])
+            word.factors.append(factor)
+            word.exponents.append(e_new)
+            word.distance += 1
+        prefix = word.hashes[-1]
+        word.hashes.append(
+            ((prefix * _BASE) + self._syllable_code(factor, e_new)) & _MASK
+        )
+
+
+class FreeGroup(FreeProduct):
+    def __init__(self, rank: int):
+        super().__init__([0] * rank)
+        self.growth_rate = 2 * rank - 1
+
+
+class IntegerLattice:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.num_generators = 2 * dim
+        # Hash of a point is sum(coords[i] * salt[i]) mod 2^64
+        self.salts = [_mix(i + 1) | 1 for i in range(dim)]
+        self.growth_rate = 1
+
+    def identity(self) -> LatticePoint:
+        return LatticePoint(self.dim)
+
+    def distance_after(self, point: LatticePoint, s: int) -> int:
+        sign = 1 - 2 * (s & 1)
+        return point.distance + (1 if point.coords[s >> 1] * sign >= 0 else -1)
+
+    def apply(self, point: LatticePoint, s: int):
+        axis = s >> 1
+        sign = 1 - 2 * (s & 1)
+        point.distance = self.distance_after(point, s)
+        point.coords[axis] += sign
+        point.key = (point.key + sign * self.salts[axis]) & _MASK
+
+
+def ball(group, radius: int) -> CayleyGraph:
+    """
+    The ball of the given radius around the identity as a finite CayleyGraph, with
+    ids in BFS order (the identity is node 0). Edges between two nodes of the outer
+    sphere are left out, so e.g. the effective resistance from the root to the
+    outer sphere is the same as in the infinite graph.
+    """
+    ids: Dict[int, int] = {group.identity().key: 0}
+    states = [group.identity()]
+    distances = [0]
+    rows: List[int] = []
+    cols: List[int] = []
+    u = 0
+    while u < len(states) and distances[u] < radius:
+        state = states[u]
+        for s in range(group.num_generators):
+            neighbor = state.copy()
+            group.apply(neighbor, s)
+            v = ids.get(neighbor.key)
+            if v is None:
+                v = ids[neighbor.key] = len(states)
+                states.append(neighbor)
+                distances.append(neighbor.distance)
+            rows.append(u)
+            cols.append(v)
+            if neighbor.distance == radius:
+                # Nodes of the outer sphere are not expanded, they get their
+                # edges from the inside
+                rows.append(v)
+                cols.append(u)
+        u += 1
+
+    rows = np.array(rows, dtype=np.int64)
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(len(states) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(rows, minlength=len(states)))
+    dtype = np.int32 if len(states) < 2**31 else np.int64
+    indices = np.array(cols, dtype=dtype)[order]
+    return CayleyGraph(offsets, indices, np.array(distances, dtype=np.int64))
+
+
+class VisitedKeys:
+    """
+    Set of 64-bit keys kept as one sorted uint64 array plus a small append buffer.
+    The buffer is merged in when it gets as large as half the array, so inserting
+    is amortized O(log n) and the memory is 8 bytes per distinct key.
+    """
+
+    def __init__(self, min_buffer: int = 1 << 16):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.buffer: List[int] = []
+        self.min_buffer = min_buffer
+
+    def add(self, key: int):
+        self.buffer.append(key)
+        if len(self.buffer) >= max(self.min_buffer, len(self.keys) // 2):
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        new = np.unique(np.array(self.buffer, dtype=np.uint64))
+        self.buffer = []
+        pos = np.searchsorted(self.keys, new)
+        known = pos < len(self.keys)
+        known[known] = self.keys[pos[known]] == new[known]
+        self.keys = np.insert(self.keys, pos[~known], new[~known])
+
+    def __contains__(self, key: int) -> bool:
+        self.flush()
+        pos = np.searchsorted(self.keys, np.uint64(key))
+        return pos < len(self.keys) and self.keys[pos] == key
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.keys)
+
+
+class LazyCayleyWalk:
+    def __init__(self, group, lambd: Optional[float] = None):
+        """
+        Simple random walk if lambd is None, otherwise RW_lambda: neighbor g * s
+        is chosen with probability proportional to lambd^(-|g * s|).
+        """
+        self.group = group
+        self.lambd = lambd
+        # Neighbors are at distance d - 1, d or d + 1, so three weights suffice
+        if lambd is None:
+            self._weight_of = {-1: 1.0, 0: 1.0, 1: 1.0}
+        else:
+            self._weight_of = {delta: lambd ** (-delta) for delta in (-1, 0, 1)}
+
+    def step(self, state, u: float):
+        """Moves `state` to a random neighbor, chosen by the uniform number u."""
+        group = self.group
+        weight_of = self._weight_of
+        d = state.distance
+        cum = []
+        total = 0.0
+        for s in range(group.num_generators):
+            total += weight_of[group.distance_after(state, s) - d]
+            cum.append(total)
+        x = u * total
+        s = 0
+        while s < len(cum) - 1 and cum[s] <= x:
+            s += 1
+        group.apply(state, s)
+
+    def first_excursion(
+        self, radius: int, rng: np.random.Generator, max_steps: Optional[int] = None
+    ) -> int:
+        """
+        Starts at the identity and walks until the first return to it, until
+        distance `radius` is reached or for at most `max_steps` steps. Returns the
+        largest distance reached in that time (at most `radius`).
+        """
+        state = self.group.identity()
+        max_distance = 0
+        t = 0
+        while max_steps is None or t < max_steps:
+            if t % _BLOCK_SIZE == 0:
+                uniforms = rng.random(_BLOCK_SIZE).tolist()
+            self.step(state, uniforms[t % _BLOCK_SIZE])
+            t += 1
+            if state.distance == 0:
+                break
+            if state.distance > max_distance:
+                max_distance = state.distance
+                if max_distance >= radius:
+                    break
+        return max_distance
+
+    def walk(
+        self,
+        steps: int,
+        rng: Optional[np.random.Generator] = None,
+        state=None,
+        track_visited: bool = True,
+        record_distances: bool = False,
+    ) -> Dict[str, object]:
+        """
+        Walks `steps` steps from `state` (the identity by default). Returns the
+        final state, number of returns to the identity, maximal and final distance,
+        the number of distinct visited vertices and optionally the distance after
+        every step.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        state = self.group.identity() if state is None else state
+
+        visited = VisitedKeys() if track_visited else None
+        if track_visited:
+            visited.add(state.key)
+        distances = np.empty(steps + 1 if record_distances else 0, dtype=np.int64)
+        if record_distances:
+            distances[0] = state.distance
+        returns = 0
+        max_distance = state.distance
+
+        for t in range(steps):
+            if t % _BLOCK_SIZE == 0:
+                uniforms = rng.random(min(_BLOCK_SIZE, steps - t)).tolist()
+            self.step(state, uniforms[t % _BLOCK_SIZE])
+
+            if state.distance == 0:
+                returns += 1
+            elif state.distance > max_distance:
+                max_distance = state.distance
+            if track_visited:
+                visited.add(state.key)
+            if record_distances:
+                distances[t + 1] = state.distance
+
+        result = {
+            "state": state,
+            "returns": returns,
+            "max_distance": max_distance,
+            "final_distance": state.distance,
+            "distinct_visited": len(visited) if track_visited else None,
+        }
+        if record_distances:
+            result["distances"] = distances
+        return result
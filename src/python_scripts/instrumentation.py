@@ -0,0 +1,132 @@
+import csv
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Hashable, List
+
+
+"""
+Counters, timers and histograms for the hot paths of the walks.
+
+Printing every step (the old verbose mode) costs far more than the step itself
+and gives output nobody can analyze. An Instrumentation object collects instead
+
+- counters, e.g. the number of steps,
+- time per phase (sampling, distance lookup, rendering, ...),
+- histograms, e.g. of the distances of the chosen nodes,
+- transition frequencies (u, v),
+
+and writes them to JSON or CSV at the end of a run. To keep the overhead low,
+the per-step code calls tick() once per step and only measures times and fills
+histograms on every sample_every-th step (tick() returns True there). Counters
+are exact, timings and histograms are over the sampled steps.
+
+Per-step tracing is still available for small runs: trace() stores a record
+(up to trace_limit of them) and by default prints it like the old verbose mode.
+"""
+
+
+class Instrumentation:
+    def __init__(self, sample_every: int = 16, trace_limit: int = 10000):
+        self.sample_every = sample_every
+        self.trace_limit = trace_limit
+        self.ticks = 0
+        # True if the last tick() is a sampled one
+        self.sampled = False
+        self.counters: Counter = Counter()
+        self.times: Dict[str, List[float]] = {}
+        self.histograms: Dict[str, Counter] = {}
+        self.transitions: Counter = Counter()
+        self.traces: List[Dict[str, object]] = []
+
+    def tick(self) -> bool:
+        """Called once per step, True on the steps that are sampled."""
+        self.ticks += 1
+        self.sampled = self.ticks % self.sample_every == 0
+        return self.sampled
+
+    def count(self, name: str, k: int = 1):
+        self.counters[name] += k
+
+    def add_time(self, name: str, seconds: float):
+        entry = self.times.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a whole block (always, meant for phases that are not per step)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def observe(self, name: str, value: Hashable):
+        self.histograms.setdefault(name, Counter())[value] += 1
+
+    def transition(self, u: int, v: int):
+        self.transitions[(u, v)] += 1
+
+    def trace(self, echo: bool = True, **fields):
+        if len(self.traces) < self.trace_limit:
+            self.traces.append(fields)
+        if echo:
+            for name, value in fields.items():
+                print(name.replace("_", " ").capitalize() + ": " + str(value))
+            print("-----------------------------")
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "sample_every": self.sample_every,
+            "ticks": self.ticks,
+            "counters": dict(self.counters),
+            "times": {
+                name: {"seconds": total, "calls": calls, "mean": total / calls}
+                for name, (total, calls) in self.times.items()
+            },
+            "histograms": {
+                name: {str(k): v for k, v in sorted(hist.items())}
+                for name, hist in self.histograms.items()
+            },
+            "transitions": [
+                [u, v, n] for (u, v), n in sorted(self.transitions.items())
+            ],
+            "traces": self.traces,
+        }
+
+    def dump_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def dump_csv(self, path: str):
+        """One row (kind, name, key, value) per counter, time, bin and transition."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", "key", "value"])
+            for name, value in self.counters.items():
+                writer.writerow(["counter", name, "", value])
+            for name, (total, calls) in self.times.items():
+                writer.writerow(["time", name, "seconds", total])
+                writer.writerow(["time", name, "calls", calls])
+            for name, hist in self.histograms.items():
+                for key, value in sorted(hist.items()):
+                    writer.writerow(["histogram", name, key, value])
+            for (u, v), n in sorted(self.transitions.items()):
+                writer.writerow(["transition", "%s->%s" % (u, v), "", n])
+
+    def dump(self, path: str):
+        """JSON or CSV, by the file extension."""
+        if path.endswith(".csv"):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+    def summary(self) -> str:
+        lines = ["steps: %d (every %d sampled)" % (self.ticks, self.sample_every)]
+        for name, (total, calls) in self.times.items():
+            lines.append(
+                "%s: %.3g s per call (%d calls)" % (name, total / calls, calls)
+            )
+        return "\n".join(lines)
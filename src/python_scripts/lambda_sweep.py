@@ -0,0 +1,177 @@
+import math
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from infinite_cayley import LazyCayleyWalk
+from walker_pool import WalkerPool
+
+
+"""
+Locating the critical value of RW_lambda on an infinite Cayley graph.
+
+Instead of changing lambd by hand and watching the walk, batches of walks are
+spread over a WalkerPool of processes. For every lambda we look at the first excursion from
+the root and count how many walkers reach distance R and how many of those also
+reach distance 2R before returning. The conditional probability
+
+    q(lambda) = P(reach 2R before returning | reach R before returning)
+
+tends to 1 in the transient regime and decays exponentially in R in the
+recurrent regime, while at the critical value it is about 1/2 (as for a
+martingale / the simple walk on Z). So lambda is classified as transient if the
+confidence interval of q lies above 1/2 and as recurrent if it lies below. We
+sample batches until that is decided (early stopping) and bisect on lambda.
+
+Note that the walks in this repository pick neighbor v with weight lambd^(-|v|),
+while the thesis puts conductance lambda^(-|e|) on edges. Neighbors one layer up
+are thereby lambd^2 times less likely than one layer down, so the walk for lambd
+is the thesis' RW_lambda with lambda = lambd^2, and its critical value is the
+square root of the growth rate. find_critical_lambda reports both.
+"""
+
+
+def wilson_interval(
+    successes: int, trials: int, z: float = 2.576
+) -> Tuple[float, float]:
+    """Wilson score interval, z = 2.576 is a 99% confidence level."""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def excursion_chunk(
+    walkers: int,
+    rng: np.random.Generator,
+    group,
+    lambd: float,
+    radius: int,
+    max_steps: Optional[int],
+) -> Tuple[int, int, int]:
+    """WalkerPool task: (walkers, reached R, reached 2R) for one chunk."""
+    walk = LazyCayleyWalk(group, lambd)
+    reached = 0
+    reached_twice = 0
+    for _ in range(walkers):
+        d = walk.first_excursion(2 * radius, rng, max_steps)
+        reached += d >= radius
+        reached_twice += d >= 2 * radius
+    return walkers, reached, reached_twice
+
+
+class LambdaSweep:
+    def __init__(
+        self,
+        group,
+        radius: int = 20,
+        batch_walkers: int = 200,
+        max_walkers: int = 20000,
+        max_steps: Optional[int] = 100000,
+        z: float = 2.576,
+        pool: Optional[WalkerPool] = None,
+        escape_threshold: float = 0.01,
+    ):
+        """
+        A lambda is also called recurrent once the confidence interval of the
+        probability to reach R lies below escape_threshold, as q is not
+        estimated when (almost) no walker gets that far.
+        """
+        self.group = group
+        self.radius = radius
+        self.max_walkers = max_walkers
+        self.max_steps = max_steps
+        self.z = z
+        self.escape_threshold = escape_threshold
+        # Early stopping is checked after every chunk, in chunk order, so the
+        # results do not depend on the number of workers
+        self.pool = pool or WalkerPool(chunk_size=batch_walkers)
+        self.results: Dict[float, Dict[str, object]] = {}
+
+    def estimate(self, lambd: float) -> Dict[str, object]:
+        """
+        Samples batches for one lambda until the confidence interval of q lies on
+        one side of 1/2 or max_walkers is reached. verdict is "transient",
+        "recurrent" or "undecided".
+        """
+        walkers = reached = reached_twice = 0
+        verdict = "undecided"
+        chunks = self.pool.imap(
+            excursion_chunk,
+            self.max_walkers,
+            self.group,
+            lambd,
+            self.radius,
+            self.max_steps,
+        )
+        try:
+            for w, r, r2 in chunks:
+                walkers += w
+                reached += r
+                reached_twice += r2
+                lo, hi = wilson_interval(reached_twice, reached, self.z)
+                if lo > 0.5:
+                    verdict = "transient"
+                    break
+                if hi < 0.5:
+                    verdict = "recurrent"
+                    break
+                # Nobody gets far: the escape probability itself is tiny
+                escape_hi = wilson_interval(reached, walkers, self.z)[1]
+                if escape_hi < self.escape_threshold:
+                    verdict = "recurrent"
+                    break
+        finally:
+            chunks.close()
+
+        result = {
+            "lambd": lambd,
+            "walkers": walkers,
+            "escape_probability": reached / walkers,
+            "escape_interval": wilson_interval(reached, walkers, self.z),
+            "q": reached_twice / reached if reached else 0.0,
+            "q_interval": wilson_interval(reached_twice, reached, self.z),
+            "verdict": verdict,
+        }
+        self.results[lambd] = result
+        return result
+
+    def _is_transient(self, lambd: float) -> bool:
+        result = self.estimate(lambd)
+        if result["verdict"] == "undecided":
+            return result["q"] > 0.5
+        return result["verdict"] == "transient"
+
+    def scan(self, lambdas: Sequence[float]) -> List[Dict[str, object]]:
+        return [self.estimate(lambd) for lambd in lambdas]
+
+    def find_critical_lambda(
+        self, low: float, high: float, grid: int = 5, tol: float = 0.01
+    ) -> Dict[str, object]:
+        """
+        Scans a coarse grid on [low, high], then bisects the bracket where the
+        verdict switches from transient to recurrent until it is shorter than tol.
+        """
+        lambdas = np.linspace(low, high, grid)
+        transient = [self._is_transient(lambd) for lambd in lambdas]
+        if not transient[0] or transient[-1]:
+            raise ValueError(
+                "The walk must be transient at `low` and recurrent at `high`"
+            )
+        i = transient.index(False)
+        low, high = lambdas[i - 1], lambdas[i]
+        while high - low > tol:
+            mid = (low + high) / 2
+            if self._is_transient(mid):
+                low = mid
+            else:
+                high = mid
+        critical = (low + high) / 2
+        return {
+            "critical_lambda": critical,
+            "bracket": (low, high),
+            # In terms of the thesis' edge conductances, see the module docstring
+            "thesis_lambda": critical**2,
+            "growth_rate": getattr(self.group, "growth_rate", None),
+        }
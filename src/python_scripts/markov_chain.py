@@ -0,0 +1,134 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from typing import Callable, Iterable, Optional, Sequence
+from transition_kernel import TransitionKernel, rw_lambda_weights
+
+
+"""
+Exact analysis of simple and RW_lambda walks on finite graphs.
+
+Instead of watching (or sampling) walks we build the sparse transition matrix P
+with P[u, v] = probability of stepping from u to v and answer questions with
+sparse linear solves and mat-vec products:
+
+- stationary distribution: pi P = pi, sum(pi) = 1
+- expected hitting times of a target set A: h = 0 on A, h = 1 + P h elsewhere
+- expected return times: 1 + sum_w P[v, w] h_v(w)
+- t-step distributions: delta_start P^t
+
+These values are exact (up to floating point) and serve as references for the
+Monte Carlo simulators.
+"""
+
+
+class MarkovChain:
+    def __init__(self, matrix: sp.spmatrix):
+        self.matrix = sp.csr_matrix(matrix, dtype=float)
+        self.num_nodes = self.matrix.shape[0]
+
+    @classmethod
+    def from_csr(
+        cls,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        distances: Optional[np.ndarray] = None,
+        lambd: Optional[float] = None,
+    ) -> "MarkovChain":
+        """
+        Simple random walk if lambd is None, otherwise RW_lambda where neighbor v
+        has conductance lambd^(-distances[v]).
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        degrees = np.diff(offsets)
+        if lambd is None:
+            weights = np.ones(len(indices))
+        else:
+            weights = rw_lambda_weights(offsets, indices, distances, lambd)
+        totals = np.add.reduceat(weights, offsets[:-1][degrees > 0])
+        row_totals = np.ones(len(degrees))
+        row_totals[degrees > 0] = totals
+        rows = np.repeat(np.arange(len(degrees)), degrees)
+        # Duplicate (u, v) entries (multi-edges) are summed up by scipy
+        matrix = sp.csr_matrix(
+            (weights / row_totals[rows], (rows, indices)),
+            shape=(len(degrees), len(degrees)),
+        )
+        return cls(matrix)
+
+    @classmethod
+    def from_neighbors(
+        cls,
+        neighbors: Sequence[Sequence[int]],
+        distance: Optional[Callable[[int], int]] = None,
+        lambd: Optional[float] = None,
+    ) -> "MarkovChain":
+        """E.g. MarkovChain.from_neighbors([node.neighbors for node in walk.nodes], ...)"""
+        offsets = np.zeros(len(neighbors) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(nbrs) for nbrs in neighbors])
+        indices = np.fromiter(
+            (v for nbrs in neighbors for v in nbrs), dtype=np.int64, count=offsets[-1]
+        )
+        distances = None
+        if lambd is not None:
+            distances = np.array([distance(v) for v in range(len(neighbors))])
+        return cls.from_csr(offsets, indices, distances, lambd)
+
+    @classmethod
+    def from_kernel(cls, kernel: TransitionKernel) -> "MarkovChain":
+        """Chain of the exact transition law a TransitionKernel samples from."""
+        rows = np.repeat(np.arange(kernel.num_nodes), kernel.degrees)
+        matrix = sp.csr_matrix(
+            (kernel.transition_probabilities(), (rows, kernel.indices)),
+            shape=(kernel.num_nodes, kernel.num_nodes),
+        )
+        return cls(matrix)
+
+    def stationary_distribution(self) -> np.ndarray:
+        """Unique stationary distribution of an irreducible chain."""
+        n = self.num_nodes
+        # (P^T - I) pi = 0 has rank n - 1, so one equation is replaced by sum(pi) = 1
+        system = (self.matrix.T - sp.identity(n, format="csr")).tolil()
+        system[n - 1, :] = np.ones(n)
+        rhs = np.zeros(n)
+        rhs[n - 1] = 1.0
+        pi = spla.spsolve(system.tocsc(), rhs)
+        return pi / pi.sum()
+
+    def hitting_times(self, targets: Iterable[int]) -> np.ndarray:
+        """Expected number of steps to reach the target set, from every node."""
+        is_target = np.zeros(self.num_nodes, dtype=bool)
+        is_target[list(targets)] = True
+        rest = np.flatnonzero(~is_target)
+        sub = self.matrix[rest][:, rest]
+        system = sp.identity(len(rest), format="csc") - sub.tocsc()
+        times = np.zeros(self.num_nodes)
+        times[rest] = spla.spsolve(system, np.ones(len(rest)))
+        return times
+
+    def expected_return_time(self, node: int) -> float:
+        """Expected time of the first return to `node` when starting at `node`."""
+        times = self.hitting_times([node])
+        row = self.matrix.getrow(node)
+        return 1.0 + float(row.data @ times[row.indices])
+
+    def distribution(self, start_node: int, steps: int) -> np.ndarray:
+        """Distribution of the walk after `steps` steps, i.e. delta_start P^t."""
+        transposed = self.matrix.T.tocsr()
+        dist = np.zeros(self.num_nodes)
+        dist[start_node] = 1.0
+        for _ in range(steps):
+            dist = transposed @ dist
+        return dist
+
+    def return_probabilities(self, start_node: int, steps: int) -> np.ndarray:
+        """P^t[start, start] for t = 0, ..., steps."""
+        transposed = self.matrix.T.tocsr()
+        dist = np.zeros(self.num_nodes)
+        dist[start_node] = 1.0
+        probs = np.empty(steps + 1)
+        probs[0] = 1.0
+        for t in range(1, steps + 1):
+            dist = transposed @ dist
+            probs[t] = dist[start_node]
+        return probs
@@ -1,15 +1,27 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import random
-from typing import List
-from Node import Node
-
-verbose = True
+import time
+import numpy as np
+from typing import Optional, Sequence
+from checkpoint import Checkpointer
+from compact_graph import CompactGraph
+from dihedral_spectrum import DihedralSpectrum
+from distance_oracle import DistanceOracle
+from instrumentation import Instrumentation
+from simulation import simulate_walk
+from transition_kernel import TransitionKernel
+
+# Prints (and keeps) the relative weights and probabilities of every step. Slow,
+# meant for small runs. Counters, timings and histograms are always collected in
+# graph_walk.stats and written to stats_file (.json or .csv) after random_walk
+verbose = False
+stats_file = None
 
 """
 For a simple random walk, that is, equal transition probabilites, set 'use_lambda_rw = False'.
 For a RW_lambda random walk as defined in my thesis, set 'use_lambda_rw = True'.
 lambd is the lambda value (lambda is a reserved name in Python).
+These are the defaults, DihedralGraphWalk(n, use_lambda_rw=..., lambd=...) overrides them
+for one walk, so walks with different lambdas can be used side by side.
 
 Try setting lambd to something small like 1.000001 and then something large like 5 or 10. 
 You will encounter the phenomena described in my thesis. This illustrates nicely, although 
@@ -20,122 +32,165 @@ lambd = 17  # lambda > 1
 
 
 class DihedralGraphWalk:
-    def __init__(self, n: int):
+    def __init__(
+        self,
+        n: int,
+        use_lambda_rw: Optional[bool] = None,
+        lambd: Optional[float] = None,
+        verbose: Optional[bool] = None,
+        stats_file: Optional[str] = None,
+    ):
+        # Arguments that are not given are taken from the settings at the top
         self.n = n
-        self.nodes = self._generate_dihedral_graph_nodes()
-        self.graph = nx.Graph()
-        self.pos = {node.id: (node.x, node.y) for node in self.nodes}
-        self._build_graph()
+        self.use_lambda_rw = (
+            globals()["use_lambda_rw"] if use_lambda_rw is None else use_lambda_rw
+        )
+        self.lambd = globals()["lambd"] if lambd is None else lambd
+        self.verbose = globals()["verbose"] if verbose is None else verbose
+        self.stats_file = globals()["stats_file"] if stats_file is None else stats_file
+        self.graph = self._generate_dihedral_graph()
+        # Node objects are created on access, for code that expects them
+        self.nodes = self.graph.nodes
+        self.distance_oracle = DistanceOracle.from_graph(
+            self.graph.offsets, self.graph.indices
+        )
+        self._kernel = None
+        self._kernel_lambd = None
+        # Counters, timings and histograms of the walks, see instrumentation.py
+        self.stats = Instrumentation()
 
-    def _generate_dihedral_graph_nodes(self) -> List[Node]:
-        nodes = []
+    def _generate_dihedral_graph(self) -> CompactGraph:
         angle_step = 2 * 3.14159 / self.n
-
-        # Rotations (a)
-        for i in range(self.n):
-            x = 10 * round(math.cos(i * angle_step), 3)
-            y = 10 * round(math.sin(i * angle_step), 3)
-            neighbors = [
-                (i + 1) % self.n,
-                i + self.n,
-            ]
-            nodes.append(Node(i, x, y, neighbors))
-
-        # Reflections (b)
-        for i in range(self.n):
-            x = 2 * 10 * round(math.cos(i * angle_step), 3)
-            y = 2 * 10 * round(math.sin(i * angle_step), 3)
-            neighbors = [
-                (i + 1) % self.n + self.n,
-                i,
-            ]
-            nodes.append(Node(i + self.n, x, y, neighbors))
-
-        return nodes
-
-    def _build_graph(self):
-        for node in self.nodes:
-            for neighbor_id in node.neighbors:
-                self.graph.add_edge(node.id, neighbor_id)
+        i = np.arange(self.n)
+        circle_x = 10 * np.round(np.cos(i * angle_step), 3)
+        circle_y = 10 * np.round(np.sin(i * angle_step), 3)
+
+        # Rotations (a) are the nodes 0, ..., n - 1 and reflections (b) the nodes
+        # n, ..., 2n - 1 on a circle twice as large
+        x = np.concatenate([circle_x, 2 * circle_x])
+        y = np.concatenate([circle_y, 2 * circle_y])
+        rotations = np.column_stack([(i + 1) % self.n, i + self.n])
+        reflections = np.column_stack([(i + 1) % self.n + self.n, i])
+        return CompactGraph.from_table(np.vstack([rotations, reflections]), x, y)
 
     def get_distance_of_node(self, id: int) -> int:
-        return min(id % self.n, self.n - (id % self.n)) if id < self.n else self.n
+        # Word metric distance to the identity (node 0), from one BFS
+        return self.distance_oracle(id)
 
     def get_random_node(self, neighbors) -> int:
-        if not use_lambda_rw:
-            return random.choice(neighbors)
+        # Timings and the distance histogram only on sampled steps (cheap)
+        sampled = self.stats.tick()
+        if sampled:
+            start = time.perf_counter()
+        if not self.use_lambda_rw:
+            ret = random.choice(neighbors)
         else:
-            conds = [lambd ** (-self.get_distance_of_node(v)) for v in neighbors]
-            total_cond = sum(conds)
-            probabilities = [c / total_cond for c in conds]
+            # Determine the weights of the neighbors
+            distances = [self.get_distance_of_node(v) for v in neighbors]
+            if sampled:
+                lookup = time.perf_counter()
+                self.stats.add_time("distance lookup", lookup - start)
+                start = lookup
+            # The conductances lambd^(-d) relative to the nearest neighbor's, since
+            # lambd^(-d) itself underflows to 0 far away from the root. The
+            # probabilities are the same.
+            nearest = min(distances)
+            weights = [self.lambd ** (nearest - d) for d in distances]
+            total_weight = sum(weights)
+            probabilities = [w / total_weight for w in weights]
             ret = random.choices(neighbors, weights=probabilities, k=1)[0]
 
-            if verbose:
-                print("Conductances: " + str(conds))
-                print("Probabilities: " + str(probabilities))
-                print("Chosen next node: " + str(ret))
-                print("-----------------------------")
-
-            return ret
-
-    def random_walk(self, start_node: int, steps: int = 10, delay: float = 0.5):
-        current_node = start_node
-        path = [current_node]
-
-        plt.ion()
-        fig, ax = plt.subplots()
-        nx.draw(
-            self.graph,
-            pos=self.pos,
-            ax=ax,
-            with_labels=True,
-            node_color="lightblue",
-            node_size=500,
-        )
-
-        for _ in range(steps):
-            nx.draw(
-                self.graph,
-                pos=self.pos,
-                ax=ax,
-                with_labels=True,
-                node_color="lightblue",
-                node_size=500,
+            if self.verbose:
+                self.stats.trace(
+                    relative_weights=weights,
+                    probabilities=probabilities,
+                    chosen_next_node=ret,
+                )
+
+        if sampled:
+            self.stats.add_time("sampling", time.perf_counter() - start)
+            self.stats.observe("distance", self.get_distance_of_node(ret))
+        return ret
+
+    def get_kernel(self) -> TransitionKernel:
+        # The transition law never changes, so it is built once per lambda
+        key = self.lambd if self.use_lambda_rw else None
+        if self._kernel is None or self._kernel_lambd != key:
+            self._kernel = TransitionKernel.from_csr(
+                self.graph.offsets,
+                self.graph.indices,
+                self.distance_oracle.distances,
+                key,
             )
-            nx.draw_networkx_nodes(
-                self.graph,
-                pos=self.pos,
-                nodelist=[current_node],
-                node_color="red",
-                node_size=700,
+            self._kernel_lambd = key
+        return self._kernel
+
+    def spectrum(self) -> DihedralSpectrum:
+        # Only for the simple walk, RW_lambda is not invariant under rotations
+        return DihedralSpectrum.from_kernel(self.get_kernel(), self.n)
+
+    def simulate(
+        self,
+        start_node: int,
+        steps: int = 10,
+        seed: Optional[int] = None,
+        statistics: Optional[Sequence[str]] = None,
+        checkpoint: Optional[Checkpointer] = None,
+    ):
+        # Same walk as random_walk, but without any drawing in the loop. Long runs
+        # with statistics can be resumed from a checkpoint (checkpoint.py), a
+        # checkpoint without statistics raises ValueError
+        kernel = self.get_kernel()
+        with self.stats.phase("simulation"):
+            result = simulate_walk(
+                kernel,
+                start_node,
+                steps,
+                rng=np.random.default_rng(seed),
+                distance=self.distance_oracle.distances,
+                statistics=statistics,
+                checkpoint=checkpoint,
             )
-            plt.draw()
-            plt.pause(delay)
-
-            neighbors = self.nodes[current_node].neighbors
-            next_node_id = self.get_random_node(neighbors)
-
-            path.append(next_node_id)
-            current_node = next_node_id
+        self.stats.count("simulated steps", steps)
+        return result
 
-            ax.cla()
-
-        plt.ioff()
-        nx.draw(
-            self.graph,
-            pos=self.pos,
-            ax=ax,
-            with_labels=True,
-            node_color="lightblue",
-            node_size=500,
-        )
-        nx.draw_networkx_nodes(
-            self.graph, pos=self.pos, nodelist=path, node_color="orange", node_size=700
+    def walk_nodes(self, start_node: int, steps: int):
+        """Yields the nodes of a walk one step at a time (lazily, for the animation)."""
+        current_node = start_node
+        yield current_node
+        for _ in range(steps):
+            neighbors = self.graph.neighbors(current_node).tolist()
+            next_node = self.get_random_node(neighbors)
+            self.stats.count("steps")
+            if self.stats.sampled:
+                self.stats.transition(current_node, next_node)
+            current_node = next_node
+            yield current_node
+
+    def random_walk(
+        self,
+        start_node: int,
+        steps: int = 10,
+        delay: float = 0.5,
+        filename: Optional[str] = None,
+    ):
+        # The graph is drawn once, frames only recolor the current and visited nodes.
+        # With a filename (.gif or e.g. .mp4) the animation is written to it instead.
+        # Imported here, so that headless runs never load matplotlib and networkx
+        from graph_renderer import GraphRenderer
+
+        renderer = GraphRenderer(
+            self.graph.to_networkx(), self.graph.positions(), stats=self.stats
         )
-        plt.show()
-
+        if filename is None:
+            renderer.show(self.walk_nodes(start_node, steps), delay=delay)
+        else:
+            renderer.save(self.walk_nodes(start_node, steps), filename, fps=1.0 / delay)
+        if self.stats_file is not None:
+            self.stats.dump(self.stats_file)
 
-import math
 
-graph_walk = DihedralGraphWalk(n=4)
-graph_walk.random_walk(start_node=0, steps=500, delay=0.2)
+if __name__ == "__main__":
+    # Demo, only when the file is run as a script
+    graph_walk = DihedralGraphWalk(n=4)
+    graph_walk.random_walk(start_node=0, steps=500, delay=0.2)
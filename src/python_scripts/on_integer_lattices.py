@@ -1,7 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional
+from trajectory_store import TrajectoryStore, TrajectoryWriter
 
 
 def random_walk_step_1d(position: Tuple[int, int]) -> Tuple[int, int]:
@@ -71,18 +70,155 @@ def random_walk_3d(steps: int = 100) -> List[Tuple[int, int, int]]:
     return path
 
 
-def animate_walk_2d(path: List[Tuple[int, int]], interval: int = 50):
-    # Convert path to numpy arrays for easier handling
-    path = np.array(path)
-    x_coords, y_coords = path[:, 0], path[:, 1]
+def _lattice_unit_steps(dim: int) -> np.ndarray:
+    # Row 2k is +e_k and row 2k + 1 is -e_k, so direction k // 2 is the axis
+    units = np.zeros((2 * dim, dim), dtype=np.int8)
+    units[0::2] = np.eye(dim, dtype=np.int8)
+    units[1::2] = -np.eye(dim, dtype=np.int8)
+    return units
+
+
+def random_walk_nd(
+    walkers: int = 1,
+    steps: int = 100,
+    dim: int = 1,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Simulates `walkers` independent simple random walks on Z^dim, all started at
+    the origin. Returns the positions as an array of shape (walkers, steps + 1, dim).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    directions = rng.integers(0, 2 * dim, size=(walkers, steps), dtype=np.int8)
+    dtype = np.int32 if steps < 2**31 else np.int64
+    positions = np.zeros((walkers, steps + 1, dim), dtype=dtype)
+    np.cumsum(_lattice_unit_steps(dim)[directions], axis=1, out=positions[:, 1:])
+    return positions
+
+
+def random_walk_nd_statistics(
+    walkers: int = 1,
+    steps: int = 100,
+    dim: int = 1,
+    chunk_steps: int = 4096,
+    rng: Optional[np.random.Generator] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Same walks as `random_walk_nd`, but only summary statistics per walker are kept,
+    so memory stays at O(walkers * chunk_steps) no matter how many steps are taken:
+    number of returns to the origin, step of the first return (-1 if none),
+    maximal graph distance from the origin and final position.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    units = _lattice_unit_steps(dim)
+    current = np.zeros((walkers, dim), dtype=np.int64)
+    returns = np.zeros(walkers, dtype=np.int64)
+    first_return = np.full(walkers, -1, dtype=np.int64)
+    max_distance = np.zeros(walkers, dtype=np.int64)
+
+    done = 0
+    while done < steps:
+        chunk = min(chunk_steps, steps - done)
+        directions = rng.integers(0, 2 * dim, size=(walkers, chunk), dtype=np.int8)
+        positions = np.cumsum(units[directions], axis=1, dtype=np.int64)
+        positions += current[:, None, :]
+
+        at_origin = ~positions.any(axis=2)
+        returns += at_origin.sum(axis=1)
+        new_return = (first_return < 0) & at_origin.any(axis=1)
+        first_return[new_return] = done + 1 + at_origin[new_return].argmax(axis=1)
+        np.maximum(
+            max_distance, np.abs(positions).sum(axis=2).max(axis=1), out=max_distance
+        )
+
+        current = positions[:, -1]
+        done += chunk
+
+    return {
+        "returns": returns,
+        "first_return": first_return,
+        "max_distance": max_distance,
+        "final_position": current,
+    }
+
+
+def record_walk_nd(
+    path: str,
+    steps: int = 100,
+    dim: int = 1,
+    chunk_steps: int = 1 << 20,
+    rng: Optional[np.random.Generator] = None,
+) -> TrajectoryStore:
+    """
+    Simulates one walk on Z^dim and writes it chunk by chunk to a trajectory store
+    in `path` (a few bits per step), so the walk never has to fit into memory.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    with TrajectoryWriter(path, "steps", dim=dim, chunk_steps=chunk_steps) as writer:
+        for done in range(0, steps, chunk_steps):
+            size = min(chunk_steps, steps - done)
+            writer.append(rng.integers(0, 2 * dim, size=size, dtype=np.int8))
+    return TrajectoryStore(path)
+
+
+def _preview_points(path, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every stride-th position of a path (a list, an array or a TrajectoryStore) and
+    the indices of these positions, with stride chosen such that there are at most
+    max_points + 1 of them. The last position is always included.
+    """
+    length = len(path)
+    stride = max(1, -(-length // max_points))
+    indices = np.arange(0, length, stride)
+    if indices[-1] != length - 1:
+        indices = np.append(indices, length - 1)
+    if isinstance(path, TrajectoryStore):
+        # Reads the store chunk by chunk, the full walk is never in memory
+        points = np.concatenate([path.positions(0, length, stride), path[-1:]])
+        points = points[: len(indices)]
+    else:
+        points = np.asarray(path)[indices]
+    return indices, points.reshape(len(indices), -1)
+
+
+def _frame_ends(num_points: int, max_frames: int) -> np.ndarray:
+    """Number of points shown in each frame, several points per frame for long paths."""
+    # The first frame shows the start, then per_frame steps are added per frame
+    per_frame = max(1, -(-(num_points - 1) // max_frames))
+    ends = np.arange(1, num_points + per_frame, per_frame)
+    return np.minimum(ends, num_points)
+
+
+def animate_walk_2d(
+    path: List[Tuple[int, int]],
+    interval: int = 50,
+    max_frames: int = 1000,
+    max_points: int = 10000,
+):
+    """
+    Long paths are decimated to at most max_points positions and shown in at most
+    max_frames frames, so walks with millions of steps (e.g. a TrajectoryStore) are
+    previewed in seconds. Each frame only moves the end of the visible part of the
+    preallocated coordinate arrays.
+    """
+    # Imported here, so that the simulations do not load matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    indices, points = _preview_points(path, max_points)
+    if points.shape[1] == 1:
+        # Walk on Z: plot the position against time as in random_walk_1d
+        points = np.column_stack([indices, points[:, 0]])
+    x_coords, y_coords = points[:, 0], points[:, 1]
+    ends = _frame_ends(len(points), max_frames)
 
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(8, 8))
 
     # Set the plot limits with some padding
     padding = 2
-    ax.set_xlim(min(x_coords) - padding, max(x_coords) + padding)
-    ax.set_ylim(min(y_coords) - padding, max(y_coords) + padding)
+    ax.set_xlim(x_coords.min() - padding, x_coords.max() + padding)
+    ax.set_ylim(y_coords.min() - padding, y_coords.max() + padding)
 
     # Initialize empty line and point
     (line,) = ax.plot([], [], "b-", label="Path")
@@ -97,16 +233,16 @@ def animate_walk_2d(path: List[Tuple[int, int]], interval: int = 50):
         return line, point
 
     def update(frame):
-        # Update line data
-        line.set_data(x_coords[: frame + 1], y_coords[: frame + 1])
-        # Update point data
-        point.set_data([x_coords[frame]], [y_coords[frame]])
+        # Views into the coordinate arrays, nothing is copied
+        end = ends[frame]
+        line.set_data(x_coords[:end], y_coords[:end])
+        point.set_data(x_coords[end - 1 : end], y_coords[end - 1 : end])
         return line, point
 
     anim = FuncAnimation(
         fig=fig,
         func=update,
-        frames=len(path),
+        frames=len(ends),
         init_func=init,
         blit=True,
         interval=interval,
@@ -116,18 +252,30 @@ def animate_walk_2d(path: List[Tuple[int, int]], interval: int = 50):
     plt.show()
 
 
-def animate_walk_3d(path: List[Tuple[int, int, int]], interval: int = 50):
+def animate_walk_3d(
+    path: List[Tuple[int, int, int]],
+    interval: int = 50,
+    max_frames: int = 1000,
+    max_points: int = 10000,
+):
+    """Decimated like animate_walk_2d."""
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    _, points = _preview_points(path, max_points)
+    x_coords, y_coords, z_coords = points[:, 0], points[:, 1], points[:, 2]
+    ends = _frame_ends(len(points), max_frames)
+
     fig = plt.figure(figsize=(10, 10))
     ax = fig.add_subplot(111, projection="3d")
     (line,) = ax.plot([], [], [], "b-", label="Path")
     (point,) = ax.plot([], [], [], "ro", markersize=10, label="Current Position")
 
     # Set the plot limits with some padding
-    x_coords, y_coords, z_coords = zip(*path)
     padding = 2
-    ax.set_xlim(min(x_coords) - padding, max(x_coords) + padding)
-    ax.set_ylim(min(y_coords) - padding, max(y_coords) + padding)
-    ax.set_zlim(min(z_coords) - padding, max(z_coords) + padding)
+    ax.set_xlim(x_coords.min() - padding, x_coords.max() + padding)
+    ax.set_ylim(y_coords.min() - padding, y_coords.max() + padding)
+    ax.set_zlim(z_coords.min() - padding, z_coords.max() + padding)
 
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
@@ -135,28 +283,24 @@ def animate_walk_3d(path: List[Tuple[int, int, int]], interval: int = 50):
     ax.legend()
 
     def init():
-        line.set_data([], [])
-        line.set_3d_properties([])
-        point.set_data([], [])
-        point.set_3d_properties([])
+        line.set_data_3d([], [], [])
+        point.set_data_3d([], [], [])
         return line, point
 
     def animate(frame):
-        # Plot the path up to the current frame
-        x_data, y_data, z_data = zip(*path[: frame + 1])
-        line.set_data(x_data, y_data)
-        line.set_3d_properties(z_data)
-
-        # Plot the current position
-        point.set_data([path[frame][0]], [path[frame][1]])
-        point.set_3d_properties([path[frame][2]])
+        # The path up to the current frame and the current position, as views
+        end = ends[frame]
+        line.set_data_3d(x_coords[:end], y_coords[:end], z_coords[:end])
+        point.set_data_3d(
+            x_coords[end - 1 : end], y_coords[end - 1 : end], z_coords[end - 1 : end]
+        )
         return line, point
 
     anim = FuncAnimation(
         fig,
         animate,
         init_func=init,
-        frames=len(path),
+        frames=len(ends),
         interval=interval,
         blit=True,
         repeat=False,
@@ -164,18 +308,20 @@ def animate_walk_3d(path: List[Tuple[int, int, int]], interval: int = 50):
     plt.show()
 
 
-dim = 1
-steps = 1000
-anim_interval = 10
+if __name__ == "__main__":
+    # Demo, only when the file is run as a script
+    dim = 1
+    steps = 1000
+    anim_interval = 10
 
-if dim == 1:
-    path_1d = random_walk_1d(steps)
-    animate_walk_2d(path_1d, interval=anim_interval)
+    if dim == 1:
+        path_1d = random_walk_1d(steps)
+        animate_walk_2d(path_1d, interval=anim_interval)
 
-elif dim == 2:
-    path_2d = random_walk_2d(steps)
-    animate_walk_2d(path_2d, interval=anim_interval)
+    elif dim == 2:
+        path_2d = random_walk_2d(steps)
+        animate_walk_2d(path_2d, interval=anim_interval)
 
-else:
-    path_3d = random_walk_3d(steps)
-    animate_walk_3d(path_3d, interval=anim_interval)
+    else:
+        path_3d = random_walk_3d(steps)
+        animate_walk_3d(path_3d, interval=anim_interval)
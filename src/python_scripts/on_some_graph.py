@@ -1,85 +1,81 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import random
-from typing import List
+import numpy as np
+from typing import List, Optional, Sequence
 from Node import Node
+from compact_graph import CompactGraph
+from graph_loaders import load_graph
+from simulation import simulate_walk
+from transition_kernel import TransitionKernel
 
 
 class GraphWalk:
-    def __init__(self, nodes: List[Node]):
-        self.nodes = {node.id: node for node in nodes}
-        self.graph = nx.Graph()
-        self.pos = {node.id: (node.x, node.y) for node in nodes}
-        self._build_graph()
+    def __init__(
+        self,
+        nodes: Optional[List[Node]] = None,
+        kernel: Optional[TransitionKernel] = None,
+        graph: Optional[CompactGraph] = None,
+    ):
+        # Either Node objects (converted once) or a ready CompactGraph
+        self.graph = graph if graph is not None else CompactGraph.from_nodes(nodes)
+        self.nodes = self.graph.nodes
+        # A custom kernel (e.g. RW_lambda weights) can be plugged in, by default
+        # all neighbors are equally likely
+        self._kernel = kernel
 
-    def _build_graph(self):
-        for node in self.nodes.values():
-            for neighbor_id in node.neighbors:
-                self.graph.add_edge(node.id, neighbor_id)
-
-    def random_walk(self, start_node: int, steps: int = 10, delay: float = 0.5):
-        current_node = start_node
-        path = [current_node]
+    def get_kernel(self) -> TransitionKernel:
+        if self._kernel is None:
+            self._kernel = TransitionKernel.from_csr(
+                self.graph.offsets, self.graph.indices
+            )
+        return self._kernel
 
-        # Initialize plot
-        plt.ion()
-        fig, ax = plt.subplots()
-        nx.draw(
-            self.graph,
-            pos=self.pos,
-            ax=ax,
-            with_labels=True,
-            node_color="lightblue",
-            node_size=500,
+    def simulate(
+        self,
+        start_node: int,
+        steps: int = 10,
+        seed: Optional[int] = None,
+        statistics: Optional[Sequence[str]] = None,
+    ):
+        # Same walk as random_walk, but without any drawing in the loop
+        return simulate_walk(
+            self.get_kernel(),
+            start_node,
+            steps,
+            rng=np.random.default_rng(seed),
+            statistics=statistics,
         )
 
-        # Perform the random walk
-        for step in range(steps):
-            # Highlight the current node
-            nx.draw(
-                self.graph,
-                pos=self.pos,
-                ax=ax,
-                with_labels=True,
-                node_color="lightblue",
-                node_size=500,
-            )
-            nx.draw_networkx_nodes(
-                self.graph,
-                pos=self.pos,
-                nodelist=[current_node],
-                node_color="red",
-                node_size=700,
-            )
-            plt.draw()
-            plt.pause(delay)
-
-            # Choose the next node randomly based on neighbors
-            neighbors = self.nodes[current_node].neighbors
-            if not neighbors:
+    def walk_nodes(self, start_node: int, steps: int):
+        """Yields the nodes of a walk one step at a time (lazily, for the animation)."""
+        # Steps are drawn from the kernel, so a custom (e.g. RW_lambda) kernel is
+        # animated with the same transition law that simulate uses
+        kernel = self.get_kernel()
+        current_node = start_node
+        yield current_node
+        for _ in range(steps):
+            if kernel.degrees[current_node] == 0:
                 print("No more neighbors to walk to.")
-                break
-            next_node = random.choice(neighbors)
-            path.append(next_node)
-            current_node = next_node
+                return
+            current_node = kernel.step(current_node, random.random())
+            yield current_node
 
-            # Clear the plot for the next step
-            ax.cla()
+    def random_walk(
+        self,
+        start_node: int,
+        steps: int = 10,
+        delay: float = 0.5,
+        filename: Optional[str] = None,
+    ):
+        # The graph is drawn once, frames only recolor the current and visited nodes.
+        # With a filename (.gif or e.g. .mp4) the animation is written to it instead.
+        # Imported here, so that headless runs never load matplotlib and networkx
+        from graph_renderer import GraphRenderer
 
-        # Show final path
-        plt.ioff()
-        nx.draw(
-            self.graph,
-            pos=self.pos,
-            ax=ax,
-            with_labels=True,
-            node_color="lightblue",
-            node_size=500,
-        )
-        nx.draw_networkx_nodes(
-            self.graph, pos=self.pos, nodelist=path, node_color="orange", node_size=700
-        )
-        plt.show()
+        renderer = GraphRenderer(self.graph.to_networkx(), self.graph.positions())
+        if filename is None:
+            renderer.show(self.walk_nodes(start_node, steps), delay=delay)
+        else:
+            renderer.save(self.walk_nodes(start_node, steps), filename, fps=1.0 / delay)
 
 
 nodes_data_1 = [
@@ -102,11 +98,16 @@ nodes_data_2 = [
     Node(6, 4, 2.5, [0, 1, 2, 3, 4, 5]),
 ]
 
-use_data_x = 1
+if __name__ == "__main__":
+    # Demo, only when the file is run as a script
+    use_data_x = 1
 
-if use_data_x == 1:
-    graph_walk = GraphWalk(nodes=nodes_data_1)
-elif use_data_x == 2:
-    graph_walk = GraphWalk(nodes=nodes_data_2)
+    if use_data_x == 1:
+        graph_walk = GraphWalk(nodes=nodes_data_1)
+    elif use_data_x == 2:
+        graph_walk = GraphWalk(nodes=nodes_data_2)
+    elif use_data_x == 3:
+        # Any graph from a file, e.g. an edge list with one "u v" pair per line
+        graph_walk = GraphWalk(graph=load_graph("edges.txt"))
 
-graph_walk.random_walk(start_node=0, steps=200, delay=0.3)
+    graph_walk.random_walk(start_node=0, steps=200, delay=0.3)
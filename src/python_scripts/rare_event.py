@@ -0,0 +1,285 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from infinite_cayley import LazyCayleyWalk
+from lambda_sweep import wilson_interval
+from transition_kernel import TransitionKernel
+from walker_pool import WalkerPool
+
+
+"""
+Return probabilities that are too small for plain Monte Carlo, by multilevel
+splitting on the distance to the root.
+
+In the transient regime (lambd below the critical value, see lambda_sweep.py) a
+walk that got far from the root comes back only with a probability that decays
+exponentially in the distance. We estimate
+
+    p = P(the walk from the root reaches distance `radius` before returning,
+          and then returns to the root before reaching distance `kill_radius`)
+
+Plain Monte Carlo needs about 100 / p walks for a relative error of 10%. Here the
+way out and back is cut into stages at the levels spacing, 2 spacing, ..., radius
+(outwards, a walker fails when it returns to the root) and radius - spacing, ...,
+0 (inwards, a walker fails at kill_radius or after max_steps). Every stage runs
+`effort` walkers. They start from the points where the successful walkers of the
+previous stage entered its level, drawn uniformly with replacement, i.e. a walker
+that reaches a new level is cloned and the clones share its weight. With p_k the
+fraction of successful walkers in stage k, the estimate p_1 * p_2 * ... is
+unbiased (each walker of stage k carries the weight p_1 ... p_(k-1) / effort, and
+the estimate is the total weight that reaches the root). Each stage only has to
+observe an event of moderate probability, so the work grows about linearly in
+-log p instead of like 1 / p.
+
+Confidence intervals come from independent replications of the whole scheme,
+which a WalkerPool runs in parallel. Note that on a finite graph every walk
+returns eventually, so there the event only becomes rare with a kill_radius.
+
+The levels are read off the word metric distances, either of a finite graph
+(KernelLevels, e.g. KernelLevels.from_walk(graph_walk) for the Z/nZ and Dn walks,
+whose get_distance_of_node uses the same distances) or of an infinite group
+(CayleyLevels, with a LazyCayleyWalk).
+"""
+
+
+class KernelLevels:
+    def __init__(self, kernel: TransitionKernel, distances: np.ndarray):
+        """Walks of `kernel`, leveled by the distances to the root (distance 0)."""
+        self.kernel = kernel
+        self.distances = np.asarray(distances, dtype=np.int64)
+        self.root = int(np.flatnonzero(self.distances == 0)[0])
+        self.max_distance = int(self.distances.max())
+
+    @classmethod
+    def from_walk(cls, graph_walk) -> "KernelLevels":
+        """For the CayleyGraphWalk and DihedralGraphWalk classes."""
+        return cls(graph_walk.get_kernel(), graph_walk.distance_oracle.distances)
+
+    def start(self, count: int) -> np.ndarray:
+        return np.full(count, self.root, dtype=np.int64)
+
+    def pick(self, states: np.ndarray, index: np.ndarray) -> np.ndarray:
+        return states[index]
+
+    def run(
+        self,
+        states: np.ndarray,
+        low: int,
+        high: Optional[int],
+        rng: np.random.Generator,
+        max_steps: Optional[int],
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Walks all walkers (at least one step) until their distance is <= low or
+        >= high. Returns the side (-1 low, 1 high, 0 out of steps), the final
+        states and the number of steps taken.
+        """
+        nodes = states.copy()
+        side = np.zeros(len(nodes), dtype=np.int8)
+        active = np.arange(len(nodes))
+        steps = 0
+        t = 0
+        while len(active) and (max_steps is None or t < max_steps):
+            nodes[active] = self.kernel.step_many(nodes[active], rng)
+            steps += len(active)
+            t += 1
+            d = self.distances[nodes[active]]
+            side[active[d <= low]] = -1
+            if high is not None:
+                side[active[d >= high]] = 1
+            active = active[side[active] == 0]
+        return side, nodes, steps
+
+
+class CayleyLevels:
+    def __init__(self, walk: LazyCayleyWalk):
+        """Walks on an infinite group, leveled by the word length."""
+        self.walk = walk
+        self.max_distance = None
+
+    def start(self, count: int) -> List[object]:
+        return [self.walk.group.identity() for _ in range(count)]
+
+    def pick(self, states: List[object], index: np.ndarray) -> List[object]:
+        # States are changed in place by the walk, so clones need their own copy
+        return [states[i].copy() for i in index.tolist()]
+
+    def run(
+        self,
+        states: List[object],
+        low: int,
+        high: Optional[int],
+        rng: np.random.Generator,
+        max_steps: Optional[int],
+    ) -> Tuple[np.ndarray, List[object], int]:
+        """As KernelLevels.run, one walker after the other."""
+        step = self.walk.step
+        side = np.zeros(len(states), dtype=np.int8)
+        steps = 0
+        uniforms: List[float] = []
+        for w, state in enumerate(states):
+            t = 0
+            while max_steps is None or t < max_steps:
+                if not uniforms:
+                    uniforms = rng.random(1 << 12).tolist()
+                step(state, uniforms.pop())
+                t += 1
+                d = state.distance
+                if d <= low:
+                    side[w] = -1
+                    break
+                if high is not None and d >= high:
+                    side[w] = 1
+                    break
+            steps += t
+        return side, states, steps
+
+
+def _stages(
+    radius: int, spacing: int, kill_radius: Optional[int]
+) -> List[Tuple[int, Optional[int], int]]:
+    """(low, high, side that counts as success) of every stage."""
+    outwards = list(range(spacing, radius, spacing)) + [radius]
+    inwards = list(range(radius - spacing, 0, -spacing)) + [0]
+    return [(0, level, 1) for level in outwards] + [
+        (level, kill_radius, -1) for level in inwards
+    ]
+
+
+def _check(levels, radius: int, kill_radius: Optional[int]):
+    if radius < 1:
+        raise ValueError("radius must be at least 1")
+    if kill_radius is not None and kill_radius <= radius:
+        raise ValueError("kill_radius must be larger than radius")
+    if levels.max_distance is not None and radius > levels.max_distance:
+        raise ValueError("The graph has no vertices at distance %d" % radius)
+
+
+def splitting_run(
+    levels,
+    radius: int,
+    effort: int,
+    rng: np.random.Generator,
+    spacing: int = 1,
+    kill_radius: Optional[int] = None,
+    max_steps: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    One replication of the splitting scheme with `effort` walkers per stage.
+    Returns the (unbiased) estimate, the success fraction of every stage and the
+    number of steps.
+    """
+    states = levels.start(effort)
+    fractions = []
+    steps = 0
+    for low, high, success in _stages(radius, spacing, kill_radius):
+        side, states, used = levels.run(states, low, high, rng, max_steps)
+        steps += used
+        successful = np.flatnonzero(side == success)
+        fractions.append(len(successful) / effort)
+        if not len(successful):
+            break
+        states = levels.pick(states, rng.choice(successful, effort))
+    return {
+        "estimate": float(np.prod(fractions)),
+        "stage_probabilities": np.array(fractions),
+        "steps": steps,
+    }
+
+
+def splitting_chunk(
+    replications: int,
+    rng: np.random.Generator,
+    levels,
+    radius: int,
+    effort: int,
+    spacing: int,
+    kill_radius: Optional[int],
+    max_steps: Optional[int],
+) -> Dict[str, np.ndarray]:
+    """WalkerPool task: estimates and steps of `replications` replications."""
+    runs = [
+        splitting_run(levels, radius, effort, rng, spacing, kill_radius, max_steps)
+        for _ in range(replications)
+    ]
+    return {
+        "estimates": np.array([run["estimate"] for run in runs]),
+        "steps": np.array([run["steps"] for run in runs], dtype=np.int64),
+    }
+
+
+def estimate_return_probability(
+    levels,
+    radius: int,
+    effort: int = 1000,
+    replications: int = 32,
+    spacing: int = 1,
+    kill_radius: Optional[int] = None,
+    max_steps: Optional[int] = None,
+    z: float = 2.576,
+    pool: Optional[WalkerPool] = None,
+) -> Dict[str, object]:
+    """
+    Mean of independent splitting replications with a normal confidence
+    interval (z = 2.576 is 99%) and the total number of steps. On infinite groups
+    in the transient regime give a kill_radius or max_steps, otherwise walkers
+    that escape never stop.
+    """
+    _check(levels, radius, kill_radius)
+    if spacing < 1:
+        raise ValueError("spacing must be at least 1")
+    pool = pool or WalkerPool(chunk_size=1)
+    runs = pool.run(
+        splitting_chunk,
+        replications,
+        levels,
+        radius,
+        effort,
+        spacing,
+        kill_radius,
+        max_steps,
+    )
+    estimates = runs["estimates"]
+    mean = float(estimates.mean())
+    half = (
+        z * estimates.std(ddof=1) / np.sqrt(len(estimates))
+        if len(estimates) > 1
+        else np.nan
+    )
+    return {
+        "estimate": mean,
+        "interval": (max(0.0, float(mean - half)), float(mean + half)),
+        "relative_error": float(half / z / mean) if mean > 0 else np.inf,
+        "steps": int(runs["steps"].sum()),
+        "estimates": estimates,
+    }
+
+
+def crude_return_probability(
+    levels,
+    radius: int,
+    walkers: int,
+    kill_radius: Optional[int] = None,
+    max_steps: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+    z: float = 2.576,
+) -> Dict[str, object]:
+    """
+    Plain Monte Carlo estimate of the same probability with a Wilson interval,
+    to compare the number of steps with estimate_return_probability.
+    """
+    _check(levels, radius, kill_radius)
+    rng = np.random.default_rng() if rng is None else rng
+    side, states, steps = levels.run(levels.start(walkers), 0, radius, rng, max_steps)
+    far = np.flatnonzero(side == 1)
+    returned = 0
+    if len(far):
+        side, _, used = levels.run(
+            levels.pick(states, far), 0, kill_radius, rng, max_steps
+        )
+        steps += used
+        returned = int((side == -1).sum())
+    return {
+        "estimate": returned / walkers,
+        "interval": wilson_interval(returned, walkers, z),
+        "steps": steps,
+    }
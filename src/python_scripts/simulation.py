@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Dict, Optional, Sequence, Union
+from checkpoint import Checkpointer
+from streaming_stats import (
+    Distance,
+    FirstPassage,
+    MaxDistance,
+    Occupation,
+    ReturnCount,
+    stream_walks,
+)
+from trajectory_store import TrajectoryStore, TrajectoryWriter
+from transition_kernel import TransitionKernel
+
+
+"""
+Headless simulation of random walks given by a TransitionKernel.
+
+Nothing in here touches matplotlib or networkx, so the speed of a walk only
+depends on the sampling loop. Plotting can still be done afterwards from the
+returned path.
+"""
+
+STATISTICS = ("returns", "first_return", "max_distance", "visits", "final_node")
+
+
+def simulate_walk(
+    kernel: TransitionKernel,
+    start_node: int,
+    steps: int,
+    rng: Optional[np.random.Generator] = None,
+    distance: Optional[Distance] = None,
+    statistics: Optional[Sequence[str]] = None,
+    checkpoint: Optional[Checkpointer] = None,
+) -> Union[np.ndarray, Dict[str, object]]:
+    """
+    Runs a walk of `steps` steps from `start_node` with the transition law of `kernel`.
+
+    Returns the visited nodes as an int array of length steps + 1. If `statistics`
+    is given, the path is not stored and a dict with the requested entries of
+    STATISTICS is returned instead ("max_distance" needs `distance`, the array of
+    the distances of all nodes or a function of the node). Only such runs can be
+    checkpointed, see stream_walks (record_walk writes long paths to disk instead).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if statistics is None:
+        if checkpoint is not None:
+            raise ValueError("Only runs with statistics can be checkpointed")
+        return kernel.sample_path(start_node, steps, rng)
+
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        raise ValueError("Unknown statistics: " + ", ".join(sorted(unknown)))
+    if "max_distance" in statistics and distance is None:
+        raise ValueError("'max_distance' needs a distance function")
+
+    # The path is fed chunk by chunk to reducers, see streaming_stats.py
+    reducers = {"returns": ReturnCount(), "first_return": FirstPassage()}
+    if "max_distance" in statistics:
+        reducers["max_distance"] = MaxDistance()
+    if "visits" in statistics:
+        reducers["visits"] = Occupation(kernel.num_nodes)
+    final = stream_walks(
+        kernel,
+        start_node,
+        steps,
+        list(reducers.values()),
+        rng=rng,
+        distance=distance if "max_distance" in statistics else None,
+        checkpoint=checkpoint,
+    )
+
+    results = {name: reducer.result() for name, reducer in reducers.items()}
+    for name in ("returns", "first_return", "max_distance"):
+        if name in results:
+            results[name] = int(results[name][0])
+    results["final_node"] = int(final[0])
+    return {name: results[name] for name in statistics}
+
+
+def record_walk(
+    kernel: TransitionKernel,
+    path: str,
+    start_node: int,
+    steps: int,
+    rng: Optional[np.random.Generator] = None,
+    chunk_steps: int = 1 << 20,
+) -> TrajectoryStore:
+    """
+    Like simulate_walk, but the visited nodes are written chunk by chunk to a
+    trajectory store in `path` instead of being kept in memory.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    dtype = np.int32 if kernel.num_nodes < 2**31 else np.int64
+    with TrajectoryWriter(
+        path, "vertices", start=start_node, chunk_steps=chunk_steps, dtype=dtype
+    ) as writer:
+        current = start_node
+        done = 0
+        while done < steps:
+            size = min(chunk_steps, steps - done)
+            chunk = kernel.sample_path(current, size, rng)[1:]
+            writer.append(chunk)
+            if len(chunk) < size:
+                # Stuck at a node without neighbors
+                break
+            current = int(chunk[-1])
+            done += size
+    return TrajectoryStore(path)
@@ -0,0 +1,254 @@
+import numpy as np
+from typing import Callable, Dict, Optional, Sequence, Union
+from checkpoint import Checkpointer, restore_generator
+from transition_kernel import TransitionKernel
+
+
+"""
+Statistics of walks computed on the fly, without storing the paths.
+
+A walk engine produces the visited nodes in chunks, an array of shape
+(walkers, k) holding the steps offset + 1, ..., offset + k of every walker, and
+feeds each chunk to a list of reducers. A reducer keeps only its running state:
+
+- ReturnCount: visits to a node (by default the start) per walker
+- FirstPassage: first step at which a walker is in a target set (by default the
+  first return to the start), -1 if it has not happened yet
+- MaxDistance: largest distance to the root per walker
+- Occupation: number of visits per node, summed over all walkers
+
+So the memory is O(walkers) or O(|V|) plus one chunk, for any number of steps.
+Reducers of disjoint batches of walkers (e.g. the chunks of a WalkerPool) are
+combined with merge, in batch order, which keeps the per-walker results in the
+order of the walkers.
+
+stream_walks runs walks with a TransitionKernel and feeds the reducers. With a
+Checkpointer it saves the walker positions, the reducers and the generator state
+between chunks and continues from the checkpoint if there is one, with exactly
+the same result as a run without interruption.
+"""
+
+Distance = Union[np.ndarray, Callable[[int], int]]
+
+
+class Reducer:
+    # Set by reducers that need the distances of the visited nodes
+    needs_distance = False
+
+    def begin(self, nodes: np.ndarray, distances: Optional[np.ndarray]):
+        """Called once with the start nodes (and their distances) of the walkers."""
+
+    def update(self, nodes: np.ndarray, distances: Optional[np.ndarray], offset: int):
+        """nodes[w, j] is the node of walker w after step offset + j + 1."""
+        raise NotImplementedError
+
+    def merge(self, other: "Reducer") -> "Reducer":
+        """Combines with the reducer of another batch of walkers."""
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """The running state (all array attributes), for checkpoints."""
+        return {k: v for k, v in vars(self).items() if isinstance(v, np.ndarray)}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class ReturnCount(Reducer):
+    def __init__(self, target: Optional[int] = None):
+        """Counts the visits to `target`, or returns to the start if target is None."""
+        self.target = target
+        self.targets = None
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def begin(self, nodes, distances):
+        self.targets = (
+            nodes if self.target is None else np.full_like(nodes, self.target)
+        )
+        self.counts = np.zeros(len(nodes), dtype=np.int64)
+
+    def update(self, nodes, distances, offset):
+        self.counts += (nodes == self.targets[:, None]).sum(axis=1)
+
+    def merge(self, other):
+        self.counts = np.concatenate([self.counts, other.counts])
+        return self
+
+    def result(self) -> np.ndarray:
+        return self.counts
+
+
+class FirstPassage(Reducer):
+    def __init__(self, targets: Optional[Sequence[int]] = None):
+        """
+        First step (>= 1) at which a walker is in `targets`, or the first return
+        to its start if targets is None.
+        """
+        self.targets = None if targets is None else np.asarray(targets)
+        self.starts = None
+        self.times = np.zeros(0, dtype=np.int64)
+
+    def begin(self, nodes, distances):
+        self.starts = nodes
+        self.times = np.full(len(nodes), -1, dtype=np.int64)
+
+    def update(self, nodes, distances, offset):
+        waiting = np.flatnonzero(self.times < 0)
+        if not len(waiting):
+            return
+        if self.targets is None:
+            hits = nodes[waiting] == self.starts[waiting, None]
+        else:
+            hits = np.isin(nodes[waiting], self.targets)
+        found = hits.any(axis=1)
+        self.times[waiting[found]] = offset + 1 + hits[found].argmax(axis=1)
+
+    def merge(self, other):
+        self.times = np.concatenate([self.times, other.times])
+        return self
+
+    def result(self) -> np.ndarray:
+        return self.times
+
+
+class MaxDistance(Reducer):
+    needs_distance = True
+
+    def __init__(self):
+        self.maxima = np.zeros(0, dtype=np.int64)
+
+    def begin(self, nodes, distances):
+        self.maxima = distances.astype(np.int64)
+
+    def update(self, nodes, distances, offset):
+        np.maximum(self.maxima, distances.max(axis=1), out=self.maxima)
+
+    def merge(self, other):
+        self.maxima = np.concatenate([self.maxima, other.maxima])
+        return self
+
+    def result(self) -> np.ndarray:
+        return self.maxima
+
+
+class Occupation(Reducer):
+    def __init__(self, num_nodes: int):
+        """Visits per node over all walkers, the start nodes included."""
+        self.counts = np.zeros(num_nodes, dtype=np.int64)
+
+    def begin(self, nodes, distances):
+        self.counts += np.bincount(nodes, minlength=len(self.counts))
+
+    def update(self, nodes, distances, offset):
+        self.counts += np.bincount(nodes.ravel(), minlength=len(self.counts))
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def result(self) -> np.ndarray:
+        return self.counts
+
+
+def _distances(distance: Distance, nodes: np.ndarray) -> np.ndarray:
+    if callable(distance):
+        flat = nodes.ravel().tolist()
+        values = np.fromiter(map(distance, flat), dtype=np.int64, count=len(flat))
+        return values.reshape(nodes.shape)
+    return np.asarray(distance)[nodes]
+
+
+def stream_walks(
+    kernel: TransitionKernel,
+    start_node: int,
+    steps: int,
+    reducers: Sequence[Reducer],
+    walkers: int = 1,
+    rng: Optional[np.random.Generator] = None,
+    distance: Optional[Distance] = None,
+    chunk_size: int = 1 << 20,
+    checkpoint: Optional[Checkpointer] = None,
+) -> np.ndarray:
+    """
+    Runs `walkers` walks of `steps` steps from `start_node` and feeds the visited
+    nodes to the reducers in chunks of about chunk_size nodes (over all walkers).
+    `distance` is an array or a function of the node, needed by MaxDistance.
+    Returns the final nodes. A single walk stops early if it gets stuck at a node
+    without neighbors.
+
+    If the checkpoint file exists, the run continues from it (with the same
+    kernel, arguments and freshly made reducers). It is also saved at the end,
+    so delete it to start over.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if distance is None and any(r.needs_distance for r in reducers):
+        raise ValueError("A reducer needs a distance function")
+
+    def feed(nodes: np.ndarray, offset: int):
+        dists = _distances(distance, nodes) if distance is not None else None
+        for reducer in reducers:
+            reducer.update(nodes, dists, offset)
+
+    current = np.full(walkers, start_node, dtype=np.int64)
+    start_dists = _distances(distance, current) if distance is not None else None
+    for reducer in reducers:
+        reducer.begin(current.copy(), start_dists)
+
+    done = 0
+    run = {
+        "start_node": start_node,
+        "steps": steps,
+        "walkers": walkers,
+        "reducers": [type(reducer).__name__ for reducer in reducers],
+    }
+    if checkpoint is not None and checkpoint.exists():
+        arrays, states, meta = checkpoint.load()
+        if {key: meta.get(key) for key in run} != run:
+            raise ValueError("The checkpoint belongs to a different run")
+        current = arrays["current"]
+        for i, reducer in enumerate(reducers):
+            prefix = "reducer%d." % i
+            reducer.set_state(
+                {k[len(prefix) :]: v for k, v in arrays.items() if k.startswith(prefix)}
+            )
+        restore_generator(rng, states["rng"])
+        done = int(meta["step"])
+
+    def save():
+        arrays = {"current": current}
+        for i, reducer in enumerate(reducers):
+            for name, value in reducer.get_state().items():
+                arrays["reducer%d.%s" % (i, name)] = value
+        checkpoint.save(done, arrays, {"rng": rng}, run)
+
+    # A multiple of the block size of sample_path, so that a single walk uses the
+    # random numbers in the same way as kernel.sample_path(start_node, steps)
+    chunk_steps = max(1, chunk_size // walkers)
+    if walkers == 1:
+        chunk_steps = max(1 << 16, chunk_steps - chunk_steps % (1 << 16))
+    while done < steps:
+        size = min(chunk_steps, steps - done)
+        if walkers == 1:
+            chunk = kernel.sample_path(int(current[0]), size, rng)[1:]
+            if not len(chunk):
+                break
+            feed(chunk[None, :], done)
+            current[0] = chunk[-1]
+            if len(chunk) < size:
+                break
+        else:
+            chunk = np.empty((walkers, size), dtype=np.int64)
+            for t in range(size):
+                current = kernel.step_many(current, rng)
+                chunk[:, t] = current
+            feed(chunk, done)
+        done += size
+        if checkpoint is not None and checkpoint.due(done):
+            save()
+    if checkpoint is not None:
+        save()
+    return current
@@ -0,0 +1,279 @@
+import json
+import os
+import numpy as np
+from typing import Iterator, Optional, Sequence
+
+
+"""
+Compact on-disk storage for long walks.
+
+A trajectory is a directory with a meta.json and chunk files chunk_000000.npy,
+chunk_000001.npy, ... holding chunk_steps steps each. Three encodings exist:
+
+- "steps": lattice walks on Z^d stored as direction indices (2k is +e_k and
+  2k + 1 is -e_k, as in on_integer_lattices.py), packed into 1, 2, 4 or 8 bits
+- "deltas": arbitrary moves on Z^d stored as int8 or int16 differences
+- "vertices": walks on graphs stored as vertex ids (int32 or int64)
+
+For the first two, anchors.npy holds the position at the start of every chunk,
+so the positions of any slice are reconstructed from one chunk only. Chunks are
+opened with np.load(mmap_mode="r"), i.e. as memory maps, and nothing is read
+before it is needed.
+"""
+
+ENCODINGS = ("steps", "deltas", "vertices")
+
+
+def _unit_steps(dim: int) -> np.ndarray:
+    # Same direction convention as _lattice_unit_steps in on_integer_lattices.py
+    units = np.zeros((2 * dim, dim), dtype=np.int64)
+    units[0::2] = np.eye(dim, dtype=np.int64)
+    units[1::2] = -np.eye(dim, dtype=np.int64)
+    return units
+
+
+def _bits_for(num_values: int) -> int:
+    bits = 1
+    while (1 << bits) < num_values:
+        bits *= 2
+    return bits
+
+
+def _pack(values: np.ndarray, bits: int) -> np.ndarray:
+    if bits == 8:
+        return values.astype(np.uint8)
+    per_byte = 8 // bits
+    padded = np.zeros(-(-len(values) // per_byte) * per_byte, dtype=np.uint8)
+    padded[: len(values)] = values
+    padded = padded.reshape(-1, per_byte)
+    packed = np.zeros(len(padded), dtype=np.uint8)
+    for i in range(per_byte):
+        packed |= padded[:, i] << (bits * i)
+    return packed
+
+
+def _unpack(packed: np.ndarray, bits: int, count: int) -> np.ndarray:
+    if bits == 8:
+        return np.asarray(packed[:count], dtype=np.uint8)
+    per_byte = 8 // bits
+    mask = (1 << bits) - 1
+    shifts = (bits * np.arange(per_byte)).astype(np.uint8)
+    values = (np.asarray(packed)[:, None] >> shifts) & mask
+    return values.ravel()[:count]
+
+
+class TrajectoryWriter:
+    def __init__(
+        self,
+        path: str,
+        encoding: str,
+        dim: int = 1,
+        start: Optional[Sequence[int]] = None,
+        chunk_steps: int = 1 << 20,
+        dtype=None,
+    ):
+        """
+        `start` is the start position (a vertex id for "vertices"). dtype is
+        int8 or int16 for "deltas" and int32 or int64 for "vertices".
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError("encoding must be one of " + ", ".join(ENCODINGS))
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.encoding = encoding
+        self.dim = dim
+        self.chunk_steps = chunk_steps
+        if encoding == "vertices":
+            self.dtype = np.dtype(dtype or np.int64)
+            self.position = int(start or 0)
+            # The start vertex is simply the first entry
+            self.buffer = [np.array([self.position], dtype=self.dtype)]
+            self.num_steps = -1
+        else:
+            self.dtype = np.dtype(dtype or np.int8) if encoding == "deltas" else None
+            self.position = np.zeros(dim, dtype=np.int64)
+            if start is not None:
+                self.position[:] = start
+            self.buffer = []
+            self.num_steps = 0
+        self.bits = _bits_for(2 * dim) if encoding == "steps" else None
+        self.buffered = sum(len(b) for b in self.buffer)
+        self.anchors = [self.position.copy()] if encoding != "vertices" else []
+        self.chunks = 0
+        self.start = self.position.tolist() if encoding != "vertices" else self.position
+        # Position after the last appended move, written or still in the buffer
+        self.last = self.position.copy() if encoding != "vertices" else self.position
+
+    def append(self, data: np.ndarray):
+        """Direction indices, deltas of shape (n, dim) or vertex ids, by encoding."""
+        data = np.asarray(data)
+        if self.encoding == "deltas":
+            limit = np.iinfo(self.dtype).max
+            if len(data) and np.abs(data).max() > limit:
+                raise ValueError("Deltas do not fit into " + self.dtype.name)
+            data = data.reshape(-1, self.dim)
+        if not len(data):
+            return
+        if self.encoding == "steps":
+            self.last = self.last + _unit_steps(self.dim)[data].sum(axis=0)
+        elif self.encoding == "deltas":
+            self.last = self.last + data.sum(axis=0)
+        else:
+            self.last = int(data[-1])
+        if self.buffered + len(data) < self.chunk_steps:
+            self.buffer.append(data)
+            self.buffered += len(data)
+            return
+        # One concatenation per call, the full chunks are then slices of it
+        data = np.concatenate(self.buffer + [data])
+        full = len(data) - len(data) % self.chunk_steps
+        for start in range(0, full, self.chunk_steps):
+            self._write_chunk(data[start : start + self.chunk_steps])
+        # A copy, so that the large array is not kept alive by the tail
+        self.buffer = [data[full:].copy()] if full < len(data) else []
+        self.buffered = len(data) - full
+
+    def append_positions(self, positions: np.ndarray):
+        """Appends the moves leading to `positions` (which follow the last appended one)."""
+        positions = np.asarray(positions)
+        if self.encoding == "vertices":
+            self.append(positions)
+            return
+        positions = positions.reshape(-1, self.dim)
+        previous = np.vstack([self.last[None, :], positions[:-1]])
+        deltas = positions - previous
+        if self.encoding == "deltas":
+            self.append(deltas)
+            return
+        axis = np.argmax(deltas != 0, axis=1)
+        signs = deltas[np.arange(len(deltas)), axis]
+        if np.any(np.abs(deltas).sum(axis=1) != 1):
+            raise ValueError("'steps' encoding needs nearest neighbor moves")
+        self.append(2 * axis + (signs < 0))
+
+    def _write_chunk(self, chunk: np.ndarray):
+        if self.encoding == "steps":
+            moves = _unit_steps(self.dim)[chunk]
+            stored = _pack(chunk, self.bits)
+        elif self.encoding == "deltas":
+            moves = chunk
+            stored = chunk.astype(self.dtype)
+        else:
+            moves = None
+            stored = chunk.astype(self.dtype)
+        np.save(os.path.join(self.path, "chunk_%06d.npy" % self.chunks), stored)
+        self.chunks += 1
+        self.num_steps += len(chunk)
+        if moves is not None:
+            self.position = self.position + moves.sum(axis=0)
+            self.anchors.append(self.position.copy())
+        else:
+            self.position = int(chunk[-1])
+
+    def close(self):
+        if self.buffered:
+            self._write_chunk(np.concatenate(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+        if self.encoding != "vertices":
+            np.save(os.path.join(self.path, "anchors.npy"), np.array(self.anchors))
+        meta = {
+            "encoding": self.encoding,
+            "dim": self.dim,
+            "bits": self.bits,
+            "dtype": self.dtype.name if self.dtype is not None else None,
+            "chunk_steps": self.chunk_steps,
+            "chunks": self.chunks,
+            "num_steps": self.num_steps,
+            "start": self.start,
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryStore:
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.encoding = self.meta["encoding"]
+        self.dim = self.meta["dim"]
+        self.chunk_steps = self.meta["chunk_steps"]
+        self.num_steps = self.meta["num_steps"]
+        self.chunks = [
+            np.load(os.path.join(path, "chunk_%06d.npy" % i), mmap_mode="r")
+            for i in range(self.meta["chunks"])
+        ]
+        self.anchors = None
+        if self.encoding != "vertices":
+            self.anchors = np.load(os.path.join(path, "anchors.npy"))
+
+    def __len__(self) -> int:
+        """Number of positions, i.e. steps + 1."""
+        return self.num_steps + 1
+
+    def _chunk_moves(self, i: int, count: Optional[int] = None) -> np.ndarray:
+        count = self._chunk_length(i) if count is None else count
+        if self.encoding == "steps":
+            directions = _unpack(self.chunks[i], self.meta["bits"], count)
+            return _unit_steps(self.dim)[directions]
+        return np.asarray(self.chunks[i][:count], dtype=np.int64)
+
+    def _chunk_length(self, i: int) -> int:
+        return min(self.chunk_steps, self.num_steps - i * self.chunk_steps)
+
+    def _chunk_positions(self, i: int) -> np.ndarray:
+        """Positions after every step of chunk i."""
+        if self.encoding == "vertices":
+            return np.asarray(self.chunks[i])
+        return self.anchors[i] + np.cumsum(self._chunk_moves(i), axis=0)
+
+    def positions(
+        self, start: int = 0, stop: Optional[int] = None, step: int = 1
+    ) -> np.ndarray:
+        """Positions with indices start, start + step, ... < stop (0 is the start)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        wanted = np.arange(start, stop, step)
+        if self.encoding == "vertices":
+            # The start vertex is the first entry of chunk 0
+            offsets = wanted
+        else:
+            offsets = wanted - 1
+        parts = []
+        if self.encoding != "vertices" and len(wanted) and wanted[0] == 0:
+            parts.append(self.anchors[0][None, :])
+            offsets = offsets[1:]
+        first_chunk = offsets // self.chunk_steps
+        for i in np.unique(first_chunk):
+            positions = self._chunk_positions(int(i))
+            parts.append(positions[offsets[first_chunk == i] - i * self.chunk_steps])
+        if not parts:
+            return np.empty(
+                (0, self.dim) if self.encoding != "vertices" else 0, dtype=np.int64
+            )
+        return np.concatenate(parts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self.positions(start, stop, step)
+        if index < 0:
+            index += len(self)
+        return self.positions(index, index + 1)[0]
+
+    def __array__(self, dtype=None, copy=None):
+        positions = self.positions()
+        return positions if dtype is None else positions.astype(dtype)
+
+    def iter_positions(self) -> Iterator[np.ndarray]:
+        """All positions chunk by chunk, for analysis in bounded memory."""
+        if self.encoding != "vertices":
+            yield self.anchors[0][None, :]
+        for i in range(len(self.chunks)):
+            yield self._chunk_positions(i)
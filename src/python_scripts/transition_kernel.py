@@ -0,0 +1,214 @@
+import numpy as np
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+"""
+Transition kernel of a simple or RW_lambda random walk, built once per (graph, lambda).
+
+The neighbors of all nodes are stored in CSR form: the neighbors of node v are
+indices[offsets[v]:offsets[v + 1]]. For every such slot we also store an alias
+table entry (Walker/Vose alias method), so that drawing the next node is O(1):
+one uniform number u picks the slot j = floor(u * deg) and the remaining fraction
+of u decides between the slot itself and its alias.
+"""
+
+
+def _alias_table(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    k = len(weights)
+    scaled = weights * (k / weights.sum())
+    prob = np.ones(k)
+    alias = np.arange(k)
+    small = [i for i in range(k) if scaled[i] < 1.0]
+    large = [i for i in range(k) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    # Leftovers are 1 up to rounding errors
+    return prob, alias
+
+
+def rw_lambda_weights(
+    offsets: np.ndarray, indices: np.ndarray, distances: np.ndarray, lambd: float
+) -> np.ndarray:
+    """
+    Unnormalized RW_lambda weights lambd^(-|v|) for every CSR slot, up to a constant
+    factor per node (which does not change the transition probabilities).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    degrees = np.diff(offsets)
+    nbr_dist = np.asarray(distances)[indices].astype(np.int64)
+    # Shifting by the row minimum keeps far away nodes from underflowing to zero
+    row_min = np.zeros(len(degrees), dtype=np.int64)
+    nonempty = degrees > 0
+    row_min[nonempty] = np.minimum.reduceat(nbr_dist, offsets[:-1][nonempty])
+    rel = nbr_dist - np.repeat(row_min, degrees)
+    return float(lambd) ** (-rel.astype(float))
+
+
+class TransitionKernel:
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ):
+        """
+        offsets/indices describe the neighbors in CSR form, weights (aligned with
+        indices) are the unnormalized transition weights. Without weights every
+        neighbor is equally likely, i.e. we get the simple random walk.
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.num_nodes = len(self.offsets) - 1
+        self.degrees = np.diff(self.offsets)
+        # Alias entries are stored relative to the node's first slot
+        self.prob = np.ones(len(self.indices))
+        self.alias = np.zeros(len(self.indices), dtype=np.int32)
+        self.alias[:] = np.arange(len(self.indices)) - np.repeat(
+            self.offsets[:-1], self.degrees
+        )
+        if weights is not None:
+            self._build_alias_tables(np.asarray(weights, dtype=float))
+        self._lists = None
+
+    @classmethod
+    def from_csr(
+        cls,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        distances: Optional[np.ndarray] = None,
+        lambd: Optional[float] = None,
+    ) -> "TransitionKernel":
+        """
+        Simple random walk if lambd is None, otherwise RW_lambda where neighbor v
+        has conductance lambd^(-distances[v]).
+        """
+        if lambd is None:
+            return cls(offsets, indices)
+        weights = rw_lambda_weights(offsets, indices, distances, lambd)
+        return cls(offsets, indices, weights)
+
+    @classmethod
+    def from_neighbors(
+        cls,
+        neighbors: Sequence[Sequence[int]],
+        distance: Optional[Callable[[int], int]] = None,
+        lambd: Optional[float] = None,
+    ) -> "TransitionKernel":
+        """
+        Builds the kernel from per-node neighbor lists (node ids must be 0, ..., n - 1),
+        e.g. [node.neighbors for node in nodes].
+        """
+        offsets = np.zeros(len(neighbors) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(nbrs) for nbrs in neighbors])
+        indices = np.fromiter(
+            (v for nbrs in neighbors for v in nbrs), dtype=np.int64, count=offsets[-1]
+        )
+        distances = None
+        if lambd is not None:
+            distances = np.array([distance(v) for v in range(len(neighbors))])
+        return cls.from_csr(offsets, indices, distances, lambd)
+
+    def _build_alias_tables(self, weights: np.ndarray):
+        # Nodes with the same degree and the same (normalized) weights share their
+        # alias table, which on Cayley graphs leaves only a handful of tables to build.
+        for k in np.unique(self.degrees):
+            if k <= 1:
+                continue
+            nodes = np.flatnonzero(self.degrees == k)
+            slots = self.offsets[nodes][:, None] + np.arange(k)
+            rows = weights[slots]
+            rows = rows / rows.sum(axis=1, keepdims=True)
+            # Group equal rows with a lexsort, np.unique(axis=0) is a lot slower
+            order = np.lexsort(rows.T[::-1])
+            sorted_rows = rows[order]
+            new_group = np.ones(len(order), dtype=bool)
+            new_group[1:] = np.any(sorted_rows[1:] != sorted_rows[:-1], axis=1)
+            bounds = np.append(np.flatnonzero(new_group), len(order))
+            for first, end in zip(bounds[:-1], bounds[1:]):
+                pattern = sorted_rows[first]
+                if np.all(pattern == pattern[0]):
+                    continue
+                prob, alias = _alias_table(pattern)
+                members = slots[order[first:end]]
+                self.prob[members] = prob
+                self.alias[members] = alias
+
+    def transition_probabilities(self) -> np.ndarray:
+        """Probability of every CSR slot, recovered from the alias tables."""
+        degrees = np.repeat(self.degrees, self.degrees).astype(float)
+        probs = self.prob / degrees
+        starts = np.repeat(self.offsets[:-1], self.degrees)
+        np.add.at(probs, starts + self.alias, (1.0 - self.prob) / degrees)
+        return probs
+
+    def step(self, node: int, u: float) -> int:
+        """Next node after `node`, given a uniform number u in [0, 1)."""
+        start = self.offsets[node]
+        x = u * self.degrees[node]
+        j = int(x)
+        slot = start + j
+        if x - j >= self.prob[slot]:
+            slot = start + self.alias[slot]
+        return int(self.indices[slot])
+
+    def step_many(self, nodes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """One step for a whole batch of walkers currently at `nodes`."""
+        x = rng.random(len(nodes)) * self.degrees[nodes]
+        j = x.astype(np.int64)
+        slots = self.offsets[nodes] + j
+        reject = (x - j) >= self.prob[slots]
+        slots[reject] = self.offsets[nodes[reject]] + self.alias[slots[reject]]
+        return self.indices[slots]
+
+    def as_lists(self) -> Tuple[List[int], List[int], List[float], List[int]]:
+        # Plain Python lists are much faster than numpy scalars in per-step loops
+        if self._lists is None:
+            self._lists = (
+                self.offsets.tolist(),
+                self.indices.tolist(),
+                self.prob.tolist(),
+                self.alias.tolist(),
+            )
+        return self._lists
+
+    def sample_path(
+        self, start_node: int, steps: int, rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """
+        Path of a walk with `steps` steps from `start_node`. The path ends early if
+        the walk gets stuck at a node without neighbors.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        offsets, indices, prob, alias = self.as_lists()
+        path = np.empty(steps + 1, dtype=np.int64)
+        path[0] = start_node
+        current = start_node
+        step = 0
+        while step < steps:
+            block = rng.random(min(1 << 16, steps - step)).tolist()
+            nodes = []
+            for u in block:
+                start = offsets[current]
+                degree = offsets[current + 1] - start
+                if not degree:
+                    return np.concatenate(
+                        [path[: step + 1], np.asarray(nodes, dtype=np.int64)]
+                    )
+                x = u * degree
+                j = int(x)
+                slot = start + j
+                if x - j >= prob[slot]:
+                    slot = start + alias[slot]
+                current = indices[slot]
+                nodes.append(current)
+            path[step + 1 : step + 1 + len(nodes)] = nodes
+            step += len(nodes)
+        return path
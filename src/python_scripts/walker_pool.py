@@ -0,0 +1,169 @@
+import copy
+import os
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+from infinite_cayley import LazyCayleyWalk
+from streaming_stats import Reducer, stream_walks
+from transition_kernel import TransitionKernel
+
+
+"""
+Reproducible process pool for ensembles of independent walkers.
+
+The walkers are split into chunks of chunk_size. Chunk i of the c-th call gets
+its own generator seeded by SeedSequence(master_seed, spawn_key=(c, i)), so the
+random streams are independent, depend only on the master seed and do not
+depend on which worker runs a chunk. Results are handed back in chunk order and
+merged in that order, so the outcome is the same for any number of workers
+(including workers=1, which runs everything in the current process).
+
+A task is a top level function task(walkers, rng, *args, **kwargs). The args are
+sent to every worker once when the pool for a call is started, not once per
+chunk, so passing a large TransitionKernel is fine.
+"""
+
+_TASK = None
+
+
+def _init_worker(task, args, kwargs):
+    global _TASK
+    _TASK = (task, args, kwargs)
+
+
+def _run_chunk(entropy, spawn_key, walkers: int):
+    task, args, kwargs = _TASK
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=spawn_key))
+    return task(walkers, rng, *args, **kwargs)
+
+
+def merge_results(results: List[object]) -> object:
+    """
+    Merges chunk results in order: arrays and lists are concatenated, numbers are
+    summed, dicts / tuples are merged entry by entry and reducers (streaming_stats)
+    by their merge method.
+    """
+    first = results[0]
+    if isinstance(first, Reducer):
+        merged = first
+        for result in results[1:]:
+            merged = merged.merge(result)
+        return merged
+    if isinstance(first, np.ndarray):
+        return np.concatenate(results)
+    if isinstance(first, dict):
+        return {key: merge_results([r[key] for r in results]) for key in first}
+    if isinstance(first, tuple):
+        return tuple(merge_results(list(parts)) for parts in zip(*results))
+    if isinstance(first, list):
+        return [x for r in results for x in r]
+    if first is None:
+        return None
+    return sum(results)
+
+
+class WalkerPool:
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 1000,
+    ):
+        # Without a seed, fresh entropy is drawn once and kept, so the run can be
+        # repeated with seed=pool.entropy
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def imap(self, task: Callable, walkers: int, *args, **kwargs) -> Iterator[object]:
+        """
+        Yields the chunk results in chunk order. Stopping the iteration early
+        cancels the chunks that have not started yet.
+        """
+        call = self.calls
+        self.calls += 1
+        starts = range(0, walkers, self.chunk_size)
+        sizes = [min(self.chunk_size, walkers - start) for start in starts]
+        if self.workers == 1:
+            _init_worker(task, args, kwargs)
+            for i, size in enumerate(sizes):
+                yield _run_chunk(self.entropy, (call, i), size)
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(task, args, kwargs),
+        )
+        pending = deque()
+        try:
+            for i, size in enumerate(sizes):
+                # A bounded window of queued chunks keeps early stopping cheap
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+                future = executor.submit(_run_chunk, self.entropy, (call, i), size)
+                pending.append(future)
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(
+        self,
+        task: Callable,
+        walkers: int,
+        *args,
+        merge: Callable[[List[object]], object] = merge_results,
+        **kwargs,
+    ) -> object:
+        return merge(list(self.imap(task, walkers, *args, **kwargs)))
+
+
+def kernel_paths(
+    walkers: int,
+    rng: np.random.Generator,
+    kernel: TransitionKernel,
+    start_node: int,
+    steps: int,
+) -> np.ndarray:
+    """Task: paths of walkers on a finite graph, shape (walkers, steps + 1)."""
+    paths = np.empty((walkers, steps + 1), dtype=kernel.indices.dtype)
+    paths[:, 0] = start_node
+    for t in range(steps):
+        paths[:, t + 1] = kernel.step_many(paths[:, t], rng)
+    return paths
+
+
+def kernel_statistics(
+    walkers: int,
+    rng: np.random.Generator,
+    kernel: TransitionKernel,
+    start_node: int,
+    steps: int,
+    reducers: Tuple[Reducer, ...],
+    distance: Optional[np.ndarray] = None,
+) -> Tuple[Reducer, ...]:
+    """
+    Task: fresh copies of the given reducers, fed with the walks of the chunk
+    without storing any paths. pool.run merges them over the chunks, e.g.
+    pool.run(kernel_statistics, walkers, kernel, 0, steps, (ReturnCount(),))
+    """
+    reducers = copy.deepcopy(reducers)
+    stream_walks(kernel, start_node, steps, reducers, walkers, rng, distance)
+    return reducers
+
+
+def lazy_walk_statistics(
+    walkers: int, rng: np.random.Generator, group, lambd: Optional[float], steps: int
+) -> dict:
+    """Task: returns, maximal and final distance of walks on an infinite group."""
+    walk = LazyCayleyWalk(group, lambd)
+    keys = ("returns", "max_distance", "final_distance")
+    stats = {key: np.empty(walkers, dtype=np.int64) for key in keys}
+    for w in range(walkers):
+        result = walk.walk(steps, rng, track_visited=False)
+        for key in stats:
+            stats[key][w] = result[key]
+    return stats
@@ -0,0 +1,131 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from checkpoint import Checkpointer
+from on_cayley_graph_Zn import CayleyGraphWalk
+from streaming_stats import (
+    FirstPassage,
+    MaxDistance,
+    Occupation,
+    ReturnCount,
+    stream_walks,
+)
+
+
+class Killed(Exception):
+    pass
+
+
+class KilledCheckpointer(Checkpointer):
+    """Stops the run right after its k-th save, as if the process was killed."""
+
+    def __init__(self, path, kills_after, **kwargs):
+        super().__init__(path, **kwargs)
+        self.kills_after = kills_after
+        self.saves = 0
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saves += 1
+        if self.saves == self.kills_after:
+            raise Killed()
+
+
+def _reducers(num_nodes):
+    return [ReturnCount(), FirstPassage([5]), MaxDistance(), Occupation(num_nodes)]
+
+
+# One walker only samples in blocks of 2^16 steps, a batch in chunk_size // walkers
+@pytest.mark.parametrize(
+    "walkers, chunk_size, steps", [(1, 1 << 16, 5 << 16), (8, 8 * 50, 500)]
+)
+def test_resumed_run_matches_uninterrupted_run(tmp_path, walkers, chunk_size, steps):
+    walk = CayleyGraphWalk(40)
+    kernel, distances = walk.get_kernel(), walk.distance_oracle.distances
+    chunk_steps = chunk_size // walkers
+
+    rng = np.random.default_rng(7)
+    reducers = _reducers(kernel.num_nodes)
+    final = stream_walks(
+        kernel, 0, steps, reducers, walkers, rng, distances, chunk_size
+    )
+
+    path = str(tmp_path / "run.npz")
+    killed = KilledCheckpointer(path, 2, every_seconds=None, every_steps=chunk_steps)
+    with pytest.raises(Killed):
+        stream_walks(
+            kernel,
+            0,
+            steps,
+            _reducers(kernel.num_nodes),
+            walkers,
+            np.random.default_rng(7),
+            distances,
+            chunk_size,
+            killed,
+        )
+    # The resumed run gets a differently seeded generator, its state comes from disk
+    resumed_rng = np.random.default_rng(123)
+    resumed_reducers = _reducers(kernel.num_nodes)
+    resumed_final = stream_walks(
+        kernel,
+        0,
+        steps,
+        resumed_reducers,
+        walkers,
+        resumed_rng,
+        distances,
+        chunk_size,
+        Checkpointer(path, every_seconds=None, every_steps=chunk_steps),
+    )
+
+    assert np.array_equal(resumed_final, final)
+    assert resumed_rng.bit_generator.state == rng.bit_generator.state
+    for resumed, reducer in zip(resumed_reducers, reducers):
+        assert np.array_equal(resumed.result(), reducer.result())
+
+
+def test_checkpoint_of_another_run_is_rejected(tmp_path):
+    walk = CayleyGraphWalk(20)
+    kernel, distances = walk.get_kernel(), walk.distance_oracle.distances
+    path = str(tmp_path / "run.npz")
+    stream_walks(
+        kernel,
+        0,
+        100,
+        _reducers(kernel.num_nodes),
+        4,
+        np.random.default_rng(0),
+        distances,
+        40,
+        Checkpointer(path, every_seconds=None),
+    )
+    for start_node, steps, walkers in [(1, 100, 4), (0, 200, 4), (0, 100, 2)]:
+        with pytest.raises(ValueError, match="different run"):
+            stream_walks(
+                kernel,
+                start_node,
+                steps,
+                _reducers(kernel.num_nodes),
+                walkers,
+                np.random.default_rng(0),
+                distances,
+                40,
+                Checkpointer(path, every_seconds=None),
+            )
+    with pytest.raises(ValueError, match="different run"):
+        stream_walks(
+            kernel,
+            0,
+            100,
+            [ReturnCount()],
+            4,
+            np.random.default_rng(0),
+            distances,
+            40,
+            Checkpointer(path, every_seconds=None),
+        )
@@ -0,0 +1,48 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from Node import Node
+from compact_graph import CompactGraph
+
+
+def _path_graph():
+    return CompactGraph.from_neighbors(
+        [[1], [0, 2], [1]], x=np.array([0.0, 1.0, 2.0]), y=np.zeros(3)
+    )
+
+
+def test_node_view_gives_the_graph_fields():
+    graph = _path_graph()
+    node = graph.nodes[1]
+    assert isinstance(node, Node)
+    assert (node.id, node.x, node.y) == (1, 1.0, 0.0)
+    assert list(node.neighbors) == [0, 2]
+    assert [n.id for n in graph.nodes.values()] == [0, 1, 2]
+    with pytest.raises(IndexError):
+        graph.nodes[3]
+
+
+@pytest.mark.parametrize("field", ["id", "x", "y", "neighbors"])
+def test_node_view_is_read_only(field):
+    graph = _path_graph()
+    node = graph.nodes[1]
+    with pytest.raises(AttributeError):
+        setattr(node, field, 5)
+    with pytest.raises(AttributeError):
+        delattr(node, field)
+    with pytest.raises(AttributeError):
+        node.neighbors.append(2)
+    assert graph.nodes[1].x == 1.0
+    assert graph.neighbors(1).tolist() == [0, 2]
+
+
+def test_round_trip_through_nodes():
+    graph = _path_graph()
+    copy = CompactGraph.from_nodes(list(graph.nodes))
+    assert np.array_equal(copy.offsets, graph.offsets)
+    assert np.array_equal(copy.indices, graph.indices)
+    assert np.array_equal(copy.x, graph.x)
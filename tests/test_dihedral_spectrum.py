@@ -0,0 +1,68 @@
+import os
+import sys
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from scipy.optimize import linear_sum_assignment
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from dihedral_spectrum import DihedralSpectrum
+from markov_chain import MarkovChain
+from on_cayley_graph_Dn import DihedralGraphWalk
+
+
+def _step_law_chain(n, generators, lazy):
+    """Walk g -> gs on D_n with s uniform on the generators a^x b^f."""
+    matrix = np.eye(2 * n) * lazy
+    for node in range(2 * n):
+        i, e = node % n, node // n
+        for x, f in generators:
+            # a^i a^x b^f = a^(i + x) b^f,  a^i b a^x b^f = a^(i - x) b^(1 + f)
+            j = (i - x if e else i + x) % n
+            target = j + n * ((e + f) % 2)
+            matrix[node, target] += (1.0 - lazy) / len(generators)
+    return MarkovChain(sp.csr_matrix(matrix))
+
+
+def _assert_same_spectrum(spectrum, chain):
+    # Many eigenvalues are (near) equal in the real part, so sorting is unstable;
+    # pair them up by the closest match instead
+    expected = np.linalg.eigvals(chain.matrix.toarray())
+    values = spectrum.eigenvalues().ravel()
+    assert len(values) == len(expected)
+    cost = np.abs(values[:, None] - expected[None, :])
+    rows, cols = linear_sum_assignment(cost)
+    assert cost[rows, cols].max() < 1e-8
+
+
+@pytest.mark.parametrize("n", [3, 4, 5, 8, 11])
+def test_graph_walk_matches_markov_chain(n):
+    walk = DihedralGraphWalk(n, use_lambda_rw=False)
+    spectrum = walk.spectrum()
+    chain = MarkovChain.from_kernel(walk.get_kernel())
+    _assert_same_spectrum(spectrum, chain)
+    for start in (0, n + 1):
+        exact = chain.return_probabilities(start, 30)
+        assert np.allclose(spectrum.return_probabilities(30, start), exact, atol=1e-12)
+        assert np.isclose(spectrum.return_probability(30, start), exact[-1])
+
+
+@pytest.mark.parametrize("n", [3, 6, 9])
+@pytest.mark.parametrize(
+    "generators, lazy",
+    [(((1, 0), (-1, 0), (0, 1)), 0.0), (((2, 1), (1, 0), (0, 1)), 0.3)],
+)
+def test_step_law_matches_markov_chain(n, generators, lazy):
+    spectrum = DihedralSpectrum.simple(n, generators, lazy)
+    chain = _step_law_chain(n, generators, lazy)
+    _assert_same_spectrum(spectrum, chain)
+    for start in (0, n):
+        exact = chain.return_probabilities(start, 30)
+        assert np.allclose(spectrum.return_probabilities(30, start), exact, atol=1e-12)
+
+
+def test_lambda_walk_has_no_spectrum():
+    walk = DihedralGraphWalk(6, use_lambda_rw=True, lambd=2.0)
+    with pytest.raises(ValueError):
+        walk.spectrum()
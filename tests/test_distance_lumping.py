@@ -0,0 +1,39 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from distance_lumping import LumpedChain
+from markov_chain import MarkovChain
+from on_cayley_graph_Dn import DihedralGraphWalk
+from on_cayley_graph_Zn import CayleyGraphWalk
+
+
+def _chains(walk, lambd):
+    graph, distances = walk.graph, walk.distance_oracle.distances
+    lumped = LumpedChain.from_graph(graph.offsets, graph.indices, distances, lambd)
+    chain = MarkovChain.from_csr(graph.offsets, graph.indices, distances, lambd)
+    return lumped, chain, distances
+
+
+@pytest.mark.parametrize("n", [7, 12, 20])
+@pytest.mark.parametrize("lambd", [None, 1.5, 3.0])
+def test_zn_matches_markov_chain(n, lambd):
+    lumped, chain, distances = _chains(CayleyGraphWalk(n), lambd)
+    assert np.isclose(
+        lumped.expected_return_time(), chain.expected_return_time(0), rtol=1e-9
+    )
+    hitting = lumped.expected_hitting_times()
+    for d in range(1, lumped.radius + 1):
+        exact = chain.hitting_times(np.flatnonzero(distances == d))[0]
+        # The sparse solve loses digits as the times grow (to 10^9 here)
+        assert np.isclose(hitting[d], exact, rtol=1e-7)
+
+
+@pytest.mark.parametrize("n", [3, 4, 5, 6])
+def test_dn_is_not_lumpable(n):
+    walk = DihedralGraphWalk(n)
+    with pytest.raises(ValueError):
+        _chains(walk, 2.0)
@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from graph_loaders import load_graph
+
+GRAPHML = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <key id="d0" for="node" attr.name="x" attr.type="double"/>
+  <key id="d1" for="node" attr.name="y" attr.type="double"/>
+  <graph id="G" edgedefault="%s">
+    <node id="a"><data key="d0">0.0</data><data key="d1">1.0</data></node>
+    <node id="b"><data key="d0">2.0</data><data key="d1">3.0</data></node>
+    <node id="c"><data key="d0">4.0</data><data key="d1">5.0</data></node>
+    <edge source="a" target="b"/>
+    <edge source="b" target="c"/>
+  </graph>
+</graphml>
+"""
+
+
+def _neighbors(graph):
+    return [sorted(graph.neighbors(v).tolist()) for v in range(len(graph.offsets) - 1)]
+
+
+@pytest.mark.parametrize("edgedefault", ["undirected", "directed"])
+def test_graphml_through_load_graph(tmp_path, edgedefault):
+    path = str(tmp_path / "graph.graphml")
+    with open(path, "w") as f:
+        f.write(GRAPHML % edgedefault)
+    expected = [[1], [0, 2], [1]] if edgedefault == "undirected" else [[1], [2], []]
+    graph = load_graph(path)
+    assert _neighbors(graph) == expected
+    np.testing.assert_array_equal(graph.x, [0.0, 2.0, 4.0])
+    # Second call is served from the cache
+    assert os.path.isdir(path + ".graph")
+    cached = load_graph(path)
+    assert _neighbors(cached) == expected
+    np.testing.assert_array_equal(cached.y, [1.0, 3.0, 5.0])
+
+
+def test_graphml_rejects_edge_list_options(tmp_path):
+    path = str(tmp_path / "graph.graphml")
+    with open(path, "w") as f:
+        f.write(GRAPHML % "undirected")
+    with pytest.raises(ValueError):
+        load_graph(path, directed=True)
+
+
+def test_edge_list_cache_follows_options(tmp_path):
+    path = str(tmp_path / "edges.txt")
+    with open(path, "w") as f:
+        f.write("0 1\n1 2\n5 2\n")
+    assert len(load_graph(path).indices) == 6
+    assert len(load_graph(path, directed=True).indices) == 3
+    assert len(load_graph(path, relabel=True).offsets) == 5
+    assert len(load_graph(path).offsets) == 7
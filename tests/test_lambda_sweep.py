@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from infinite_cayley import FreeGroup
+from lambda_sweep import LambdaSweep
+from walker_pool import WalkerPool
+
+
+def test_strongly_recurrent_lambda_stops_early():
+    # The critical lambd of F_2 is sqrt(3), at lambd = 5 nobody reaches distance 20
+    sweep = LambdaSweep(
+        FreeGroup(2),
+        radius=20,
+        max_walkers=20000,
+        pool=WalkerPool(seed=0, workers=1, chunk_size=200),
+    )
+    result = sweep.estimate(5.0)
+    assert result["verdict"] == "recurrent"
+    assert result["walkers"] < sweep.max_walkers
+
+
+def test_transient_lambda():
+    sweep = LambdaSweep(
+        FreeGroup(2), radius=5, pool=WalkerPool(seed=0, workers=1, chunk_size=200)
+    )
+    assert sweep.estimate(1.05)["verdict"] == "transient"
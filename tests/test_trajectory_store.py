@@ -0,0 +1,51 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from trajectory_store import TrajectoryStore, TrajectoryWriter
+
+
+def _lattice_walk(steps: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    units = np.vstack([np.eye(dim, dtype=np.int64), -np.eye(dim, dtype=np.int64)])
+    moves = units[rng.integers(0, 2 * dim, steps)]
+    return np.vstack([np.zeros((1, dim), dtype=np.int64), np.cumsum(moves, axis=0)])
+
+
+@pytest.mark.parametrize("encoding", ["steps", "deltas"])
+def test_append_positions_in_several_calls(tmp_path, encoding):
+    # Call lengths that do not line up with chunk_steps, so that moves of an
+    # earlier call are still buffered when the next one arrives
+    walk = _lattice_walk(20 + 30 + 1 + 13, 2, np.random.default_rng(0))
+    path = str(tmp_path / encoding)
+    with TrajectoryWriter(path, encoding, dim=2, chunk_steps=7) as writer:
+        start = 1
+        for length in (20, 30, 1, 13):
+            writer.append_positions(walk[start : start + length])
+            start += length
+    np.testing.assert_array_equal(np.asarray(TrajectoryStore(path)), walk)
+
+
+def test_append_and_append_positions_mixed(tmp_path):
+    walk = _lattice_walk(25, 3, np.random.default_rng(1))
+    moves = np.diff(walk, axis=0)
+    directions = 2 * np.argmax(moves != 0, axis=1) + (moves.sum(axis=1) < 0)
+    path = str(tmp_path / "mixed")
+    with TrajectoryWriter(path, "steps", dim=3, chunk_steps=4) as writer:
+        writer.append(directions[:9])
+        writer.append_positions(walk[10:18])
+        writer.append(directions[17:])
+    np.testing.assert_array_equal(np.asarray(TrajectoryStore(path)), walk)
+
+
+def test_vertices_in_several_calls(tmp_path):
+    path = str(tmp_path / "vertices")
+    vertices = np.random.default_rng(2).integers(0, 100, 40)
+    with TrajectoryWriter(path, "vertices", start=5, chunk_steps=6) as writer:
+        writer.append_positions(vertices[:11])
+        writer.append_positions(vertices[11:])
+    np.testing.assert_array_equal(
+        np.asarray(TrajectoryStore(path)), np.concatenate([[5], vertices])
+    )
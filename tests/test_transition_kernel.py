@@ -0,0 +1,18 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from transition_kernel import TransitionKernel
+
+
+def test_stuck_path_keeps_integer_ids():
+    # Node 0 -> node 1, which has no neighbors
+    kernel = TransitionKernel(np.array([0, 1, 1]), np.array([1]))
+    stuck_at_start = kernel.sample_path(1, 5, np.random.default_rng(0))
+    np.testing.assert_array_equal(stuck_at_start, [1])
+    assert stuck_at_start.dtype == np.int64
+    stuck_later = kernel.sample_path(0, 5, np.random.default_rng(0))
+    np.testing.assert_array_equal(stuck_later, [0, 1])
+    assert stuck_later.dtype == np.int64
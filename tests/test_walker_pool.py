@@ -0,0 +1,43 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "python_scripts"))
+
+from infinite_cayley import FreeGroup
+from on_cayley_graph_Zn import CayleyGraphWalk
+from walker_pool import WalkerPool, kernel_paths, lazy_walk_statistics
+
+
+def _run_with(workers, task, walkers, *args):
+    return WalkerPool(seed=2024, workers=workers, chunk_size=7).run(
+        task, walkers, *args
+    )
+
+
+def test_kernel_paths_do_not_depend_on_workers():
+    kernel = CayleyGraphWalk(30).get_kernel()
+    one = _run_with(1, kernel_paths, 40, kernel, 0, 50)
+    two = _run_with(2, kernel_paths, 40, kernel, 0, 50)
+    assert one.shape == (40, 51)
+    assert np.array_equal(one, two)
+
+
+@pytest.mark.parametrize("lambd", [None, 2.0])
+def test_lazy_walk_statistics_do_not_depend_on_workers(lambd):
+    one = _run_with(1, lazy_walk_statistics, 30, FreeGroup(2), lambd, 200)
+    two = _run_with(2, lazy_walk_statistics, 30, FreeGroup(2), lambd, 200)
+    assert one.keys() == two.keys()
+    for key in one:
+        assert len(one[key]) == 30
+        assert np.array_equal(one[key], two[key])
+
+
+def test_other_seed_gives_other_paths():
+    kernel = CayleyGraphWalk(30).get_kernel()
+    paths = _run_with(1, kernel_paths, 40, kernel, 0, 50)
+    other = WalkerPool(seed=2025, workers=1, chunk_size=7).run(
+        kernel_paths, 40, kernel, 0, 50
+    )
+    assert not np.array_equal(paths, other)